@@ -2,9 +2,11 @@ from .base import Exporter, NoExporterFound
 
 # To load all parser
 from .subrip import SubRipExporter
+from .microdvd import MicroDVDExporter
 
 __all__ = [
     "NoExporterFound",
     "Exporter",
     "SubRipExporter",
+    "MicroDVDExporter",
 ]
@@ -87,3 +87,30 @@ class Exporter(object):
         output.write(self._export_end(subtitle.meta))
 
         # Done
+
+    async def aexport(self, writer, subtitle, metadata=None):
+        """
+        Exports to an async 'writer', asyncio.StreamWriter (waits for it to drain after
+        every write) or anything with a coroutine write method. Besides Subtitle,
+        'subtitle' may be an (async) iterable of units, e.g. from Parser.aiter_units,
+        with subtitle wide 'metadata' passed separately.
+        """
+        if isinstance(subtitle, Subtitle):
+            metadata = subtitle.meta
+        metadata = metadata or {}
+
+        async def write(data):
+            if hasattr(writer, "drain"):
+                writer.write(data)
+                await writer.drain()
+            else:
+                await writer.write(data)
+
+        await write(self._export_metadata(metadata))
+        if hasattr(subtitle, "__aiter__"):
+            async for unit in subtitle:
+                await write(self._export_unit(unit))
+        else:
+            for unit in subtitle:
+                await write(self._export_unit(unit))
+        await write(self._export_end(metadata))
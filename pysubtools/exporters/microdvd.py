@@ -0,0 +1,131 @@
+import array
+import functools
+
+from .base import Exporter
+
+from ..subtitle import Frame, Subtitle
+from ..timestamps import seconds_to_frames
+
+
+@functools.lru_cache(maxsize=256)
+def _tags(styles, position, upper):
+    """
+    Returns header tags for 'styles' (sorted pairs of style and value) and
+    'position' (x and y or None), the reverse of MicroDVDParser._parse_header.
+    """
+    styles = dict(styles)
+    tags = []
+
+    font_style = []
+    if styles.get("font-weight") == "bold":
+        font_style.append("b")
+    if styles.get("text-style") == "italic":
+        font_style.append("i")
+    for decoration in styles.get("text-decoration", "").split():
+        if decoration == "underline":
+            font_style.append("u")
+        elif decoration == "line-through":
+            font_style.append("s")
+    if font_style:
+        tags.append(("y", ",".join(font_style)))
+    if "font-family" in styles:
+        tags.append(("f", styles["font-family"]))
+    if "font-size" in styles:
+        size = styles["font-size"]
+        tags.append(("s", size[:-2] if size.endswith("px") else size))
+    if "color" in styles:
+        color = styles["color"]
+        tags.append(("c", "$" + color[5:7] + color[3:5] + color[1:3]))
+    if position is not None:
+        # Position is never local
+        tags.append(("P", "{},{}".format(*position)))
+
+    return "".join("{{{}:{}}}".format(k.upper() if upper else k, v) for k, v in tags)
+
+
+class MicroDVDExporter(Exporter):
+    """Exporter for MicroDVD format."""
+
+    FORMAT = "MicroDVD"
+
+    def _init(self, encoding="utf-8", line_ending=b"\r\n", fps=None):
+        """
+        Timings in seconds are converted to frames at 'fps', or at the fps of the
+        subtitle. Frame timings are written as they are.
+        """
+        self._encoding = encoding
+        self._line_ending = line_ending
+        self._fps = fps
+        self._rate = fps
+        self._frames = None
+
+    @staticmethod
+    def _header(styles, position, upper):
+        styles = (styles or {}).get("*", {})
+        return _tags(
+            tuple(sorted(styles.items())),
+            (position["x"], position["y"]) if position else None,
+            upper,
+        )
+
+    def _convert_times(self, times):
+        """Returns frames of all 'times', converting those in seconds in one batch."""
+        seconds = [float(i) for i in times if not isinstance(i, Frame)]
+        if seconds and not self._rate:
+            raise ValueError("Cannot convert time to frames without specified FPS.")
+        converted = iter(seconds_to_frames(seconds, self._rate) if seconds else ())
+        return array.array(
+            "q",
+            (i._frame if isinstance(i, Frame) else next(converted) for i in times),
+        )
+
+    def export(self, output, subtitle):
+        if isinstance(subtitle, Subtitle):
+            # Convert timings of all units at once, they are looked up while writing
+            self._rate = self._fps or subtitle.meta.get("fps")
+            self._frames = self._convert_times(
+                [time for unit in subtitle for time in (unit.start, unit.end)]
+            )
+        try:
+            super(MicroDVDExporter, self).export(output, subtitle)
+        finally:
+            self._frames = None
+
+    def _export_metadata(self, metadata):
+        self._unit = 0
+        self._rate = self._fps or metadata.get("fps")
+
+        output = []
+        if self._rate:
+            # Frame rate declaration, see MicroDVDParser.FPS_RE
+            output.append("{{1}}{{1}}{:g}".format(self._rate))
+        header = self._header(metadata.get("styles"), metadata.get("position"), True)
+        if header:
+            output.append("{DEFAULT}" + header)
+        return b"".join(i.encode(self._encoding) + self._line_ending for i in output)
+
+    def _export_unit(self, unit):
+        if self._frames is not None:
+            start, end = self._frames[2 * self._unit : 2 * self._unit + 2]
+        else:
+            # Streamed units are converted one by one
+            start, end = self._convert_times([unit.start, unit.end])
+        self._unit += 1
+
+        header = self._header(
+            getattr(unit, "styles", None), getattr(unit, "position", None), True
+        )
+        text = "|".join(
+            self._header(getattr(line, "styles", None), None, False) + line.text
+            for line in unit
+        )
+        return (
+            "{{{}}}{{{}}}{}{}".format(start, end, header, text).encode(
+                self._encoding, "ignore"
+            )
+            + self._line_ending
+        )
+
+    def _export_end(self, metadata):
+        # No footer
+        return b""
@@ -1,6 +1,7 @@
 from .base import Exporter
 
 from ..subtitle import HumanTime
+from ..timestamps import format_time, to_milliseconds
 
 
 class SubRipExporter(Exporter):
@@ -14,20 +15,12 @@ class SubRipExporter(Exporter):
 
     @staticmethod
     def _convert_time(time):
-        output = []
-
-        if isinstance(time, (float, int)):
-            time = HumanTime.from_seconds(time)
-        elif not isinstance(time, HumanTime):
+        if isinstance(time, HumanTime):
+            time = time.to_seconds()
+        elif not isinstance(time, (float, int)):
             raise TypeError("Expecting time")
 
-        output.append("{:02d}".format(time.hours))
-        output.append("{:02d}".format(time.minutes))
-        seconds = int(time.seconds)
-        miliseconds = int((time.seconds - seconds) * 1000)
-        output.append("{:02d},{:03d}".format(seconds, miliseconds))
-
-        return ":".join(output)
+        return format_time(to_milliseconds(time))
 
     def _export_metadata(self, metadata):
         # No subtitle wide metadata, just reset counter
@@ -1,4 +1,7 @@
 from .base import Parser, NoParserError, ParseError
+from .cache import DetectionCache
+from .priors import EncodingPriors
+from .stats import ParseStats
 from . import encodings
 
 # To load all parser
@@ -7,6 +10,9 @@ from . import microdvd  # noqa: F401
 
 __all__ = [
     "Parser",
+    "DetectionCache",
+    "EncodingPriors",
+    "ParseStats",
     "EncodingError",
     "NoParserError",
     "ParseError",
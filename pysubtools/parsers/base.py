@@ -1,7 +1,25 @@
+import collections
+import functools
 import io
+import os
+import re
 import typing
 
 from . import encodings
+from .cache import DetectionCache
+from .diagnostics import Diagnostics
+from .incremental import LineBuffer, achunks
+from .mapped import open_mapped
+from .stats import ParseStats
+from .priors import EncodingPriors
+
+
+# Raw data, a file object or a filename
+Data = typing.Union[bytes, str, "os.PathLike[str]", io.BytesIO, io.BufferedReader]
+# Detection reasons of pushed data that the rest of it can still disprove
+PROVISIONAL_REASONS = ("ascii", "utf-8")
+
+_non_ascii = re.compile(rb"[\x80-\xff]")
 
 
 class NoParserError(Exception):
@@ -16,8 +34,15 @@ class ParseError(Exception):
         self.description = description
         super(ParseError, self).__init__(self.description)
 
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        # Needed to pass it between processes
+        return (
+            self.__class__,
+            (self.line_number, self.column, self.line, self.description),
+        )
+
     def __str__(self) -> str:
-        return str(self)
+        return self.__unicode__()
 
     def __unicode__(self) -> str:
         return "Parse error on line {} at column {} error occurred '{}'".format(
@@ -43,49 +68,104 @@ class Parser(object):
     """Abstract class for all parsers."""
 
     LEVELS = ("warning", "error")
+    # How many of the last read lines are kept for messages
+    LINE_HISTORY = 16
+    # How many bytes are looked at to recognize the format
+    SNIFF_SIZE = 16384
+    # Whether the format can be parsed while data is still arriving (see aiter_units)
+    STREAMABLE = True
     FORMAT: str = ""
     _subtitle: typing.Optional[typing.Any] = None
     _stop_level: str = "error"
     parsed = None
+    # Subtitle wide metadata of the last parse
+    metadata: typing.Dict[str, typing.Any] = {}
     encoding: typing.Optional[str] = None
     encoding_confidence = None
+    # Why the encoding was chosen, see encodings.Detection
+    encoding_reason: typing.Optional[str] = None
+
+    # Parsers by format and how many times each format was recognized
+    _registry: typing.Dict[str, typing.Type["Parser"]] = {}
+    _sniff_hits: typing.Counter[str] = collections.Counter()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Subclasses that keep the format of their parent do not replace it
+        if cls.__dict__.get("FORMAT"):
+            Parser._registry[cls.FORMAT] = cls
 
-    def __init__(self, stop_level: str = "error"):
-        self.warnings: typing.List[ParserErrorMessage] = []
-        self.errors: typing.List[ParserErrorMessage] = []
-        self._data = None
+    def __init__(
+        self,
+        stop_level: str = "error",
+        max_messages: typing.Optional[int] = None,
+        quiet: bool = False,
+        stats: typing.Optional[ParseStats] = None,
+    ):
+        self.stats = stats
+        # Quiet parser fixes what it can silently and keeps no messages, errors still
+        # stop it according to 'stop_level'
+        self.quiet = quiet
+        # Messages by level, at most 'max_messages' of each are kept
+        self.diagnostics: typing.Dict[str, Diagnostics] = {
+            level: Diagnostics(max_messages) for level in self.LEVELS
+        }
+        # Text file object, or LineBuffer with pushed data
+        self._data: typing.Any = None
         self._stop_level: str = stop_level
 
         # Part of the parser internals
-        self._read_lines: typing.List[typing.Union[str, bytes]] = []
+        self._read_lines: typing.Deque[typing.Union[str, bytes]] = collections.deque(
+            maxlen=self.LINE_HISTORY
+        )
         self._current_line_num: int = -1
         self._current_line: typing.Optional[typing.Union[str, bytes]] = None
 
+        # State of feed, data waiting for encoding detection and units being parsed
+        self._pending: typing.Optional[bytearray] = None
+        self._pending_options: typing.Tuple[typing.Any, ...] = ()
+        self._pushed_units: typing.Optional[typing.Iterator[typing.Any]] = None
+        # Encoding pushed data is checked against and data waiting to be detected again
+        self._provisional: typing.Optional[str] = None
+        self._redetect: typing.Optional[bytearray] = None
+
     def _add_msg(
-        self, level: str, line_number: int, column: int, line: str, description: str
+        self,
+        level: str,
+        line_number: int,
+        column: int,
+        line: str,
+        description: str,
+        args: typing.Tuple[typing.Any, ...] = (),
     ):
+        if self.quiet and level == "warning":
+            return
         if self._stop_level and self.LEVELS.index(level) >= self.LEVELS.index(
             self._stop_level
         ):
+            description = description.format(*args) if args else description
             if level == "warning":
                 raise ParseWarning(line_number, column, line, description)
             elif level == "error":
                 raise ParseError(line_number, column, line, description)
 
-        line = str(line)
-        description = str(description)
+        if self.quiet:
+            return
+        # Line is converted and description formatted only if the message is kept
+        self.diagnostics[level].add(line_number, column, line, description, args)
 
-        msg: ParserErrorMessage = {
-            "line_number": int(line_number),
-            "col": int(column),
-            "line": line,
-            "description": description,
-        }
+    @property
+    def warnings(self) -> typing.List[ParserErrorMessage]:
+        """
+        Kept warnings, built anew on each access. Changing the list does not change
+        the parser, use add_warning for that.
+        """
+        return list(self.diagnostics["warning"])
 
-        if level == "warning":
-            self.warnings.append(msg)
-        elif level == "error":
-            self.errors.append(msg)
+    @property
+    def errors(self) -> typing.List[ParserErrorMessage]:
+        """Kept errors, built like warnings. Use add_error to add one."""
+        return list(self.diagnostics["error"])
 
     def add_warning(self, *args, **kwargs):
         self._add_msg("warning", *args, **kwargs)
@@ -93,21 +173,43 @@ class Parser(object):
     def add_error(self, *args, **kwargs):
         self._add_msg("error", *args, **kwargs)
 
+    def _warn(
+        self,
+        description: str,
+        *args: typing.Any,
+        column: int = 1,
+        line: typing.Optional[str] = None,
+    ) -> None:
+        """
+        Warns about the current line ('line' defaults to the one read). Description is
+        formatted with 'args' once read and the line is fetched only if the parser is
+        not quiet.
+        """
+        if self.quiet:
+            return
+        self.add_warning(
+            self._current_line_num + 1,
+            column,
+            self._fetch_line(self._current_line_num) if line is None else line,
+            description,
+            args,
+        )
+
     @staticmethod
     def _normalize_data(
-        data: typing.Union[bytes, io.BytesIO, io.BufferedReader]
+        data: Data,
     ) -> typing.Union[io.BytesIO, io.BufferedReader]:
         if isinstance(data, bytes):
             data = io.BytesIO(data)
+        elif isinstance(data, (str, os.PathLike)):
+            data = open_mapped(data)
         elif not isinstance(data, (io.BytesIO, io.BufferedReader)):
-            raise TypeError("Needs to be a file object or bytes.")
+            raise TypeError("Needs to be a file object, filename or bytes.")
         data.seek(0)
         return data
 
     @classmethod
-    def can_parse(
-        cls, data: typing.Union[bytes, io.BytesIO, io.BufferedReader]
-    ) -> bool:
+    def can_parse(cls, data: Data) -> bool:
         data = cls._normalize_data(data)
         return cls._can_parse(data)
 
@@ -129,38 +231,89 @@ class Parser(object):
         """Parses the subtitle metadata (if format has a header at all)."""
         return {}
 
-    def parse(
+    def _set_data(
         self,
-        data: typing.Optional[typing.Union[io.BytesIO, io.BufferedReader]] = None,
+        data: Data,
         encoding: typing.Optional[str] = None,
         language: typing.Optional[str] = None,
-        **kwargs,
-    ) -> typing.Any:
-        """Parses the file and returns the subtitle. Check warnings after the parse."""
-        if data:
-            # We have new data, discard old and set up for new
-            if self._data is not None:
-                try:
-                    self._data.detach()
-                except Exception:
-                    pass
-            self._data = self._normalize_data(data)
-            # Check encoding
-            self.encoding, self.encoding_confidence = encodings.detect(
-                self._data, encoding=encoding, language=language
-            )
-            self._data.seek(0)
-            # Wrap it
-            self._data = io.TextIOWrapper(
-                self._data, self.encoding, newline="", errors="replace"
-            )
+        sample_size: typing.Optional[int] = None,
+        cache: typing.Optional[DetectionCache] = None,
+        priors: typing.Optional[EncodingPriors] = None,
+    ) -> None:
+        # We have new data, discard old and set up for new
+        if self._data is not None:
+            try:
+                self._data.detach()
+            except Exception:
+                pass
+        # Lines are counted from the start of the new data
+        self._current_line_num = -1
+        self._current_line = None
+        self._read_lines.clear()
+        self._data = self._normalize_data(data)
+        self._detect(self._data, encoding, language, sample_size, cache, priors)
+        # Wrap it
+        self._data = io.TextIOWrapper(
+            self._data, self.encoding, newline="", errors="replace"
+        )
 
-        from .. import Subtitle, SubtitleUnit
+    def _detect(
+        self,
+        data: typing.Union[io.BytesIO, io.BufferedReader],
+        encoding: typing.Optional[str] = None,
+        language: typing.Optional[str] = None,
+        sample_size: typing.Optional[int] = None,
+        cache: typing.Optional[DetectionCache] = None,
+        priors: typing.Optional[EncodingPriors] = None,
+    ) -> None:
+        detect = functools.partial(
+            encodings.detect,
+            data,
+            encoding=encoding,
+            language=language,
+            sample_size=sample_size,
+            cache=cache,
+            priors=priors,
+        )
+        if self.stats is None:
+            detected = detect()
+        else:
+            detected = self.stats.measure("detect", detect)
+            self.stats.end("detect", self._size(data))
+        self.encoding, self.encoding_confidence = detected
+        self.encoding_reason = detected.reason
+        data.seek(0)
 
-        sub = Subtitle(**self._parse_metadata())
-        for unit in self._parse(**kwargs):
+    @staticmethod
+    def _size(data: typing.Union[io.BytesIO, io.BufferedReader]) -> int:
+        position = data.tell()
+        size = data.seek(0, io.SEEK_END)
+        data.seek(position)
+        return size
+
+    def _read_metadata(self) -> None:
+        if self.stats is None:
+            self.metadata = self._parse_metadata()
+        else:
+            self.metadata = self.stats.measure("metadata", self._parse_metadata)
+            self.stats.end("metadata")
+
+    def _iter_units(self, **kwargs) -> typing.Iterator[typing.Any]:
+        from .. import SubtitleUnit
+
+        parsed = self._parse(**kwargs)
+        create: typing.Callable[..., typing.Any] = SubtitleUnit
+        if self.stats is not None:
+            parsed = self.stats.timed_iter("parse", parsed)
+            create = self.stats.timed("units", SubtitleUnit)
+
+        for unit in parsed:
+            if unit is None:
+                # Pushed data ran out, pass it on to the one feeding it
+                yield None
+                continue
             try:
-                sub.append(SubtitleUnit(**unit["data"]))
+                unit = create(**unit["data"])
             except TypeError:
                 # We may have malformed units
                 self.add_error(
@@ -169,39 +322,382 @@ class Parser(object):
                     self._current_line,
                     "Wrongly parsed unit, might be a result of a previous error.",
                 )
+                continue
+            yield unit
+
+        if self.stats is not None:
+            self.stats.count(self)
+            self.stats.end("parse")
+            self.stats.end("units")
+
+    def parse(
+        self,
+        data: typing.Optional[Data] = None,
+        encoding: typing.Optional[str] = None,
+        language: typing.Optional[str] = None,
+        sample_size: typing.Optional[int] = None,
+        cache: typing.Optional[DetectionCache] = None,
+        priors: typing.Optional[EncodingPriors] = None,
+        **kwargs,
+    ) -> typing.Any:
+        """
+        Parses the file and returns the subtitle. Check warnings after the parse. See
+        encodings.detect for 'encoding', 'language', 'sample_size', 'cache' and 'priors'.
+        """
+        if data:
+            self._set_data(data, encoding, language, sample_size, cache, priors)
+
+        from .. import Subtitle
+
+        self._read_metadata()
+        sub = Subtitle(**self.metadata)
+        append = sub.append
+        if self.stats is not None:
+            append = self.stats.timed("build", append)
+        for unit in self._iter_units(**kwargs):
+            append(unit)
+        if self.stats is not None:
+            self.stats.end("build")
+        # Metadata found between units
+        vars(sub).update(self.metadata)
+        return sub
+
+    def iter_units(
+        self,
+        data: typing.Optional[Data] = None,
+        encoding: typing.Optional[str] = None,
+        language: typing.Optional[str] = None,
+        sample_size: typing.Optional[int] = None,
+        cache: typing.Optional[DetectionCache] = None,
+        priors: typing.Optional[EncodingPriors] = None,
+        **kwargs,
+    ) -> typing.Iterator[typing.Any]:
+        """
+        Same as parse, but yields subtitle units as they are parsed instead of building
+        the subtitle. Subtitle metadata is in 'metadata' once all units are yielded,
+        warnings and errors are collected as parsing goes.
+        """
+        if data:
+            self._set_data(data, encoding, language, sample_size, cache, priors)
+
+        self._read_metadata()
+        yield from self._iter_units(**kwargs)
+
+    async def aiter_units(
+        self,
+        source: typing.Any,
+        encoding: typing.Optional[str] = None,
+        language: typing.Optional[str] = None,
+        sample_size: typing.Optional[int] = None,
+        cache: typing.Optional[DetectionCache] = None,
+        priors: typing.Optional[EncodingPriors] = None,
+        detect_size: int = 65536,
+        **kwargs,
+    ) -> typing.AsyncIterator[typing.Any]:
+        """
+        Same as iter_units, but reads 'source' (asyncio.StreamReader or an async
+        iterator of bytes) and yields units as soon as the data for them arrives. The
+        encoding is detected like with feed. Formats that are not STREAMABLE are parsed
+        once all of the data has arrived.
+        """
+        options: typing.Dict[str, typing.Any] = dict(
+            encoding=encoding,
+            language=language,
+            sample_size=sample_size,
+            cache=cache,
+            priors=priors,
+            detect_size=detect_size,
+        )
+        async for chunk in achunks(source):
+            for unit in self.feed(chunk, **options, **kwargs):
+                yield unit
+        for unit in self.close():
+            yield unit
+
+    def feed(
+        self,
+        data: bytes,
+        encoding: typing.Optional[str] = None,
+        language: typing.Optional[str] = None,
+        sample_size: typing.Optional[int] = None,
+        cache: typing.Optional[DetectionCache] = None,
+        priors: typing.Optional[EncodingPriors] = None,
+        detect_size: int = 65536,
+        **kwargs,
+    ) -> typing.List[typing.Any]:
+        """
+        Pushes the next chunk of 'data' and returns units that were completed by it.
+        Parsing starts once 'detect_size' bytes are buffered and the encoding of whole
+        lines in them is detected, with options given with the first chunk. Data
+        detected as ASCII is detected again from the first non-ASCII byte on. If the
+        rest of data detected as UTF-8 is not such, its invalid bytes are replaced and
+        a warning is added. Formats that are not STREAMABLE are parsed on close. Call
+        close at the end of data.
+        """
+        if self._pushed_units is not None:
+            self._push(data)
+            return self._pull_units()
+
+        if self._pending is None:
+            self._pending = bytearray()
+            self._pending_options = (
+                encoding,
+                language,
+                sample_size,
+                cache,
+                priors,
+                detect_size,
+                kwargs,
+            )
+        self._pending += data
+        if not self.STREAMABLE or len(self._pending) < detect_size:
+            return []
+        self._start_push(bytes(self._pending))
+        if self._pushed_units is None:
+            # No whole line to detect from yet
+            return []
+        return self._pull_units()
+
+    def close(self) -> typing.List[typing.Any]:
+        """Ends data pushed with feed and returns the remaining units."""
+        if self._pushed_units is None:
+            if not self._pending:
+                # Nothing was fed
+                self._pending = None
+                return []
+            if not self.STREAMABLE:
+                *options, _, kwargs = self._pending_options
+                data = bytes(self._pending)
+                self._pending = None
+                return list(self.iter_units(data, *options, **kwargs))
+            self._start_push(bytes(self._pending), final=True)
+
+        if self._redetect is not None:
+            self._switch_encoding(final=True)
+        self._decode(final=True)
+        units = self._pull_units()
+        self._pushed_units = None
+        self._provisional = None
+        return units
+
+    @staticmethod
+    def _whole_lines(data: bytes, final: bool) -> int:
+        """Returns length of whole lines in 'data', all of it at the end of data."""
+        if final:
+            return len(data)
+        return max(data.rfind(b"\n"), data.rfind(b"\r")) + 1
+
+    def _start_push(self, data: bytes, final: bool = False) -> None:
+        """Starts parsing pending 'data' once its encoding can be detected."""
+        *options, _, kwargs = self._pending_options
+        # A multibyte character cut at the end would mislead detection
+        size = self._whole_lines(data, final)
+        if not size:
+            return
+        self._pending = None
+        self._set_data(data[:size], *options)
+        assert self.encoding is not None
+        # Continue with the decoded data instead
+        self._data.detach()
+        self._provisional = self._provisional_encoding(final)
+        self._data = LineBuffer(
+            self.encoding, "strict" if self._provisional else "replace"
+        )
+        self._push(data)
+
+        self._read_metadata()
+        self._pushed_units = self._iter_units(**kwargs)
+
+    def _provisional_encoding(self, final: bool) -> typing.Optional[str]:
+        if final or self.encoding_reason not in PROVISIONAL_REASONS:
+            return None
+        return self.encoding
+
+    def _push(self, data: bytes) -> None:
+        """Decodes pushed 'data', checking it against the provisional encoding."""
+        found = _non_ascii.search(data) if self._provisional == "ascii" else None
+        if found:
+            # Text decoded so far is the same in any ASCII compatible encoding, the
+            # rest needs to be detected again
+            start = found.start()
+            self._decode(data[:start])
+            self._provisional = None
+            self._redetect, data = bytearray(), data[start:]
+        if self._redetect is not None:
+            self._redetect += data
+            if len(self._redetect) >= self._pending_options[-2]:
+                self._switch_encoding()
+            return
+        self._decode(data)
+
+    def _switch_encoding(self, final: bool = False) -> None:
+        if self._redetect is None:
+            return
+        data = bytes(self._redetect)
+        size = self._whole_lines(data, final)
+        if not size:
+            return
+        self._redetect = None
+        self._detect(io.BytesIO(data[:size]), *self._pending_options[:-2])
+        assert self.encoding is not None
+        if "\n".encode(self.encoding) != b"\n":
+            raise encodings.EncodingError(
+                "Data detected as ascii continues as {}.".format(self.encoding),
+                ["ascii", self.encoding],
+            )
+        self._provisional = self._provisional_encoding(final)
+        self._data.set_encoding(
+            self.encoding, "strict" if self._provisional else "replace"
+        )
+        self._push(data)
+
+    def _decode(self, data: bytes = b"", final: bool = False) -> None:
+        try:
+            if final:
+                self._data.close()
+            else:
+                self._data.feed(data)
+        except UnicodeDecodeError:
+            # Text before is already parsed, so the rest is decoded the way parse
+            # would decode it
+            self._provisional = None
+            self._data.replace_errors()
+            self._decode(data, final)
+            found = self._data.find("\ufffd")
+            index, column, line = found if found else (0, 0, "")
+            self.add_warning(
+                self._current_line_num + index + 2,
+                column + 1,
+                line,
+                "Data detected as {} is not such after all, invalid bytes are replaced.",
+                (self.encoding,),
+            )
+
+    def _pull_units(self) -> typing.List[typing.Any]:
+        units = []
+        for unit in self._pushed_units or ():
+            if unit is None:
+                # Waiting for more data
+                break
+            units.append(unit)
+        return units
+
+    async def aparse(self, source: typing.Any, **kwargs) -> typing.Any:
+        """Same as parse, but reads 'source' like aiter_units."""
+        from .. import Subtitle
+
+        units = [unit async for unit in self.aiter_units(source, **kwargs)]
+        sub = Subtitle(**self.metadata)
+        for unit in units:
+            sub.append(unit)
         return sub
 
     @staticmethod
     def from_data(
-        data: typing.Union[bytes, io.BytesIO, io.BufferedReader],
+        data: Data,
         encoding: typing.Optional[str] = None,
         language: typing.Optional[str] = None,
+        sample_size: typing.Optional[int] = None,
+        cache: typing.Optional[DetectionCache] = None,
+        priors: typing.Optional[EncodingPriors] = None,
         **kwargs,
     ) -> "Parser":
         """Returns a parser that can parse 'data' in raw string."""
         data = Parser._normalize_data(data)
-        encoding, encoding_confidence = encodings.detect(data, encoding, language)
+        stats = kwargs.get("stats")
+        detect = functools.partial(
+            encodings.detect,
+            data,
+            encoding,
+            language,
+            sample_size=sample_size,
+            cache=cache,
+            priors=priors,
+        )
+        if stats is None:
+            parser_class = Parser.sniff(data)
+            detected = detect()
+        else:
+            size = Parser._size(data)
+            parser_class = stats.measure("sniff", Parser.sniff, data)
+            stats.end("sniff", min(size, Parser.SNIFF_SIZE))
+            detected = stats.measure("detect", detect)
+            stats.end("detect", size)
         data.seek(0)
 
-        for parser in Parser.__subclasses__():
-            if not parser.can_parse(data):
-                continue
-            parser = parser(**kwargs)
-            parser._data = io.TextIOWrapper(
-                data, encoding, newline="", errors="replace"
-            )
-            parser.encoding = encoding
-            parser.encoding_confidence = encoding_confidence
-            return parser
+        parser = parser_class(**kwargs)
+        parser._data = io.TextIOWrapper(data, detected[0], newline="", errors="replace")
+        parser.encoding, parser.encoding_confidence = detected
+        parser.encoding_reason = detected.reason
+        return parser
+
+    @staticmethod
+    def sniff(
+        data: Data,
+    ) -> typing.Type["Parser"]:
+        """
+        Returns parser class for format of 'data', without detecting its encoding. Only
+        the first SNIFF_SIZE bytes are read, once, and checked by all registered parsers,
+        most often found formats first.
+        """
+        data = Parser._normalize_data(data)
+        prefix = data.read(Parser.SNIFF_SIZE)
+        data.seek(0)
+
+        for parser in sorted(
+            Parser._registry.values(), key=lambda i: -Parser._sniff_hits[i.FORMAT]
+        ):
+            if parser._can_parse(io.BytesIO(prefix)):
+                Parser._sniff_hits[parser.FORMAT] += 1
+                return parser
         raise NoParserError("Could not find parser.")
 
+    @staticmethod
+    def parse_many(
+        inputs: typing.Iterable[typing.Union[str, bytes]],
+        format: typing.Optional[str] = None,
+        workers: typing.Optional[int] = None,
+        ordered: bool = True,
+        encoding: typing.Optional[str] = None,
+        language: typing.Optional[str] = None,
+        sample_size: typing.Optional[int] = None,
+        cache: typing.Optional[DetectionCache] = None,
+        priors: typing.Optional[EncodingPriors] = None,
+        parse_options: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        **kwargs,
+    ) -> typing.Iterator[typing.Any]:
+        """
+        Parses many 'inputs' (filenames or bytes) in a pool of 'workers' processes and
+        yields a batch.ParseResult for each of them, in input order or, if 'ordered' is
+        False, as they finish. Largest inputs are parsed first. If 'format' is not set,
+        it is detected (see from_data). Exceptions are returned in results, not raised.
+
+        Detection options are passed to encodings.detect, 'parse_options' to parse and
+        the rest of 'kwargs' to the parser.
+        """
+        from .batch import parse_many
+
+        return parse_many(
+            inputs,
+            format=format,
+            workers=workers,
+            ordered=ordered,
+            encoding=encoding,
+            language=language,
+            sample_size=sample_size,
+            cache=cache,
+            priors=priors,
+            parse_options=parse_options,
+            **kwargs,
+        )
+
     @staticmethod
     def from_format(format: str, **kwargs) -> "Parser":
         """Returns a parser with 'name'."""
-        for parser in Parser.__subclasses__():
-            if parser.FORMAT == format:
-                return parser(**kwargs)
-        raise NoParserError("Could not find parser.")
+        try:
+            return Parser._registry[format](**kwargs)
+        except KeyError:
+            raise NoParserError("Could not find parser.")
 
     def __del__(self):
         # Detach _data
@@ -227,12 +723,16 @@ class Parser(object):
     def _fetch_line(self, line: int) -> typing.Union[str, bytes]:
         if line > self._current_line_num:
             raise ValueError("Cannot seek forward.")
+        # Position in history, counted from the end
+        index = line - self._current_line_num - 1
+        if -index > len(self._read_lines):
+            raise ValueError("Line is no longer in history.")
 
-        return self._read_lines[line].rstrip()
+        return self._read_lines[index].rstrip()
 
     def _rewind(self) -> None:
         self._current_line_num = -1
-        self._read_lines = []
+        self._read_lines.clear()
         self._current_line = None
         if self._data:
             self._data.seek(0)
@@ -0,0 +1,117 @@
+import concurrent.futures
+import os
+import typing
+
+from .base import Parser, ParserErrorMessage
+from .cache import DetectionCache
+from .priors import EncodingPriors
+
+Source = typing.Union[str, "os.PathLike[str]", bytes]
+
+
+class ParseResult(typing.NamedTuple):
+    """Outcome of parsing one input of Parser.parse_many."""
+
+    subtitle: typing.Optional[typing.Any]
+    warnings: typing.List[ParserErrorMessage]
+    errors: typing.List[ParserErrorMessage]
+    encoding: typing.Optional[str]
+    format: typing.Optional[str]
+    # Exception that stopped the parse, if any
+    exception: typing.Optional[Exception] = None
+    # Position of the input
+    position: int = 0
+
+
+def _size(source: Source) -> int:
+    if isinstance(source, bytes):
+        return len(source)
+    try:
+        return os.path.getsize(source)
+    except OSError:
+        # Will fail later, in the worker
+        return 0
+
+
+def parse_one(
+    index: int,
+    source: Source,
+    format: typing.Optional[str] = None,
+    detect_options: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    parse_options: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    **kwargs,
+) -> ParseResult:
+    """
+    Parses a single 'source' (filename or bytes) and returns ParseResult. Exceptions are
+    caught and returned in the result.
+    """
+    detect_options = detect_options or {}
+    parse_options = parse_options or {}
+    parser = None
+    subtitle = None
+    exception = None
+    try:
+        # Files are memory mapped by the parser
+        if format:
+            parser = Parser.from_format(format, **kwargs)
+            subtitle = parser.parse(source, **detect_options, **parse_options)
+        else:
+            parser = Parser.from_data(source, **detect_options, **kwargs)
+            subtitle = parser.parse(**parse_options)
+    except Exception as e:
+        exception = e
+
+    return ParseResult(
+        subtitle,
+        parser.warnings if parser else [],
+        parser.errors if parser else [],
+        parser.encoding if parser else None,
+        parser.FORMAT if parser else None,
+        exception,
+        index,
+    )
+
+
+def parse_many(
+    inputs: typing.Iterable[Source],
+    format: typing.Optional[str] = None,
+    workers: typing.Optional[int] = None,
+    ordered: bool = True,
+    encoding: typing.Optional[str] = None,
+    language: typing.Optional[str] = None,
+    sample_size: typing.Optional[int] = None,
+    cache: typing.Optional[DetectionCache] = None,
+    priors: typing.Optional[EncodingPriors] = None,
+    parse_options: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    **kwargs,
+) -> typing.Iterator[ParseResult]:
+    """See Parser.parse_many."""
+    inputs = list(inputs)
+    detect_options = dict(
+        encoding=encoding,
+        language=language,
+        sample_size=sample_size,
+        cache=cache,
+        priors=priors,
+    )
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures: typing.Dict[int, concurrent.futures.Future] = {}
+        # Largest first, so they do not hold up the end of the batch
+        for index in sorted(range(len(inputs)), key=lambda i: -_size(inputs[i])):
+            futures[index] = executor.submit(
+                parse_one,
+                index,
+                inputs[index],
+                format,
+                detect_options,
+                parse_options,
+                **kwargs,
+            )
+
+        if ordered:
+            for index in range(len(inputs)):
+                yield futures.pop(index).result()
+        else:
+            for future in concurrent.futures.as_completed(futures.values()):
+                yield future.result()
@@ -0,0 +1,27 @@
+"""Builds encoding priors from a corpus, see pysubtools.parsers.priors."""
+
+import argparse
+import typing
+
+from .priors import EncodingPriors
+
+
+def main(args: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Builds encoding priors from corpus.")
+    parser.add_argument("corpus", help="directory with language/encoding/ subdirs")
+    parser.add_argument("output", help="where to save the priors (JSON)")
+    options = parser.parse_args(args)
+
+    priors = EncodingPriors.build(options.corpus)
+    priors.save(options.output)
+    for language, counts in sorted(priors.counts.items()):
+        guesses = priors.guess(language, min_share=0)
+        print(
+            "{}: {}".format(
+                language, ", ".join("{} ({})".format(i, counts[i]) for i in guesses)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import hashlib
+import io
+import sqlite3
+import time
+import typing
+
+
+class DetectionCache(object):
+    """
+    On-disk cache of encoding detection results. Results are keyed by the hash of the
+    content and the hints used for detection. When the cache grows over 'max_entries',
+    least recently used results are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._connection: typing.Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Connect lazily, so the cache can be handed over to other processes
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS detections ("
+                    "key TEXT PRIMARY KEY, encoding TEXT, confidence REAL, used REAL)"
+                )
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS detections_used ON detections (used)"
+                )
+        return self._connection
+
+    @staticmethod
+    def key(
+        data: typing.Union[io.BytesIO, io.BufferedReader],
+        *hints: typing.Any,
+    ) -> str:
+        """Returns a key for whole 'data' and detection 'hints'. Rewinds 'data' afterwards."""
+        data.seek(0)
+        digest = hashlib.blake2b()
+        for chunk in iter(lambda: data.read(65536), b""):
+            digest.update(chunk)
+        data.seek(0)
+        return "{}:{}".format(digest.hexdigest(), ":".join(map(repr, hints)))
+
+    def get(
+        self, key: str
+    ) -> typing.Optional[typing.Tuple[str, typing.Optional[float]]]:
+        """Returns cached (encoding, confidence) for 'key' or None."""
+        with self.connection as connection:
+            row = connection.execute(
+                "SELECT encoding, confidence FROM detections WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE detections SET used = ? WHERE key = ?", (time.time(), key)
+            )
+        return row[0], row[1]
+
+    def set(self, key: str, encoding: str, confidence: typing.Optional[float]) -> None:
+        """Stores detection result for 'key' and evicts least recently used ones."""
+        with self.connection as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO detections VALUES (?, ?, ?, ?)",
+                (key, encoding, confidence, time.time()),
+            )
+            connection.execute(
+                "DELETE FROM detections WHERE used < ("
+                "SELECT used FROM detections ORDER BY used DESC LIMIT 1 OFFSET ?)",
+                (self.max_entries - 1,),
+            )
+
+    def clear(self) -> None:
+        with self.connection as connection:
+            connection.execute("DELETE FROM detections")
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+
+    def __getstate__(self) -> typing.Dict[str, typing.Any]:
+        state = dict(self.__dict__)
+        state["_connection"] = None
+        return state
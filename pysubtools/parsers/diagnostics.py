@@ -0,0 +1,88 @@
+import array
+import collections
+import typing
+
+if typing.TYPE_CHECKING:
+    from .base import ParserErrorMessage
+
+
+class Diagnostics(object):
+    """
+    Compact store of parser messages of one level. Each message is kept as a
+    description code, line number, column, an index of its line text and arguments the
+    description is formatted with, texts are shared between messages. Only the first
+    'limit' messages are kept, but all of them are counted by description.
+    """
+
+    # Descriptions (unformatted, there is a fixed number of them) by code, shared by
+    # all stores
+    _descriptions: typing.List[str] = []
+    _description_codes: typing.Dict[str, int] = {}
+
+    def __init__(self, limit: typing.Optional[int] = None):
+        self.limit = limit
+        self.counts: typing.Counter[str] = collections.Counter()
+        self._codes = array.array("l")
+        self._line_numbers = array.array("l")
+        self._columns = array.array("l")
+        self._text_indexes = array.array("l")
+        self._args: typing.List[typing.Tuple[typing.Any, ...]] = []
+        self._texts: typing.List[str] = []
+        self._text_codes: typing.Dict[str, int] = {}
+
+    @classmethod
+    def _code(cls, description: str) -> int:
+        try:
+            return cls._description_codes[description]
+        except KeyError:
+            cls._descriptions.append(description)
+            return cls._description_codes.setdefault(
+                description, len(cls._descriptions) - 1
+            )
+
+    def add(
+        self,
+        line_number: int,
+        column: int,
+        line: str,
+        description: str,
+        args: typing.Tuple[typing.Any, ...] = (),
+    ) -> None:
+        """Adds a message, 'description' is formatted with 'args' when read."""
+        self.counts[description] += 1
+        if self.limit is not None and len(self) >= self.limit:
+            return
+
+        line = str(line)
+        text = self._text_codes.get(line)
+        if text is None:
+            text = self._text_codes[line] = len(self._texts)
+            self._texts.append(line)
+
+        self._codes.append(self._code(description))
+        self._line_numbers.append(int(line_number))
+        self._columns.append(int(column))
+        self._text_indexes.append(text)
+        self._args.append(args)
+
+    @property
+    def dropped(self) -> int:
+        """Number of messages over the limit."""
+        return sum(self.counts.values()) - len(self)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __getitem__(self, index: int) -> "ParserErrorMessage":
+        description = self._descriptions[self._codes[index]]
+        args = self._args[index]
+        return {
+            "line_number": self._line_numbers[index],
+            "col": self._columns[index],
+            "line": self._texts[self._text_indexes[index]],
+            "description": description.format(*args) if args else description,
+        }
+
+    def __iter__(self) -> typing.Iterator["ParserErrorMessage"]:
+        for index in range(len(self)):
+            yield self[index]
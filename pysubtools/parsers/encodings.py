@@ -1,8 +1,13 @@
 import io
 import codecs
+import locale
 import typing
 import charset_normalizer
 
+if typing.TYPE_CHECKING:
+    from .cache import DetectionCache
+    from .priors import EncodingPriors
+
 invalid_chars = "\x9e"
 similar_encodings = {
     "ISO-8859-2": ["windows-1250"],
@@ -11,6 +16,32 @@ similar_encodings = {
     # Just a try
     "EUC-TW": ["BIG5-TW"],
 }
+language_encodings = {
+    "sl": ["windows-1250"],
+    "pl": ["windows-1250"],
+    "ko": ["euckr"],
+    "ja": ["sjis"],
+    "ar": ["windows-1256"],
+    "el": ["windows-1253"],
+    "zh": ["big5"],
+    "he": ["windows-1255"],
+    "ru": ["koi8-r"],
+    "fr": ["windows-1252"],
+    "bg": ["windows-1251"],
+    "mk": ["windows-1251"],
+    "th": ["windows-874"],
+    "uk": ["koi8-u"],
+    "sr": ["windows-1251"],
+    "vi": ["windows-1258"],
+    "fa": ["windows-1256"],
+    "fi": ["iso8859-15"],
+    "es": ["iso8859-15"],
+    "pt": ["iso8859-15"],
+    "da": ["iso8859-15"],
+    "pt-br": ["iso8859-15"],
+}
+# Minimal confidence every sample needs for sampled detection to be trusted
+sample_confidence = 0.9
 
 
 class EncodingError(Exception):
@@ -20,124 +51,317 @@ class EncodingError(Exception):
         self.tried_encodings = tried_encodings
         super(EncodingError, self).__init__(message, *args, **kwargs)
 
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        # Needed to pass it between processes
+        return self.__class__, self.args[:1] + (self.tried_encodings,) + self.args[1:]
 
-def guess_from_lang(lang: str) -> typing.List[str]:
-    """Specify ISO-639-1 language to guess probable encoding."""
-    guesses = {
-        "sl": ["windows-1250"],
-        "pl": ["windows-1250"],
-        "ko": ["euckr"],
-        "ja": ["sjis"],
-        "ar": ["windows-1256"],
-        "el": ["windows-1253"],
-        "zh": ["big5"],
-        "he": ["windows-1255"],
-        "ru": ["koi8-r"],
-        "es": ["windows-1252"],  # TODO: This is a repeat?
-        "fr": ["windows-1252"],
-        "bg": ["windows-1251"],
-        "mk": ["windows-1251"],
-        "th": ["windows-874"],
-        "uk": ["koi8-u"],
-        "sr": ["windows-1251"],
-        "vi": ["windows-1258"],
-        "fa": ["windows-1256"],
-        "fi": ["iso8859-15"],
-        "es": ["iso8859-15"],  # TODO: This is a repeat?
-        "pt": ["iso8859-15"],
-        "da": ["iso8859-15"],
-        "pt-br": ["iso8859-15"],
-    }
+
+def guess_from_lang(
+    lang: str, priors: typing.Optional["EncodingPriors"] = None
+) -> typing.List[str]:
+    """
+    Specify ISO-639-1 language to guess probable encoding. If 'priors' know the language,
+    their guesses (most likely first) are used instead of the built-in table.
+    """
+    if priors is not None:
+        guesses = priors.guess(lang)
+        if guesses:
+            return guesses
 
     # Revert to chardet
-    return guesses.get(lang, [])
+    return list(language_encodings.get(lang, []))
+
+
+def with_similar(
+    encodings: typing.List[typing.Tuple[str, typing.Optional[float]]],
+    exclude: typing.Iterable[str] = (),
+) -> typing.List[typing.Tuple[str, typing.Optional[float]]]:
+    """
+    Returns 'encodings' in order they should be tried, each followed by its similar
+    encodings. Repeated encodings and those in 'exclude' are left out.
+    """
+    seen = set(exclude)
+    output: typing.List[typing.Tuple[str, typing.Optional[float]]] = []
+
+    def add(encoding: str, confidence: typing.Optional[float]) -> None:
+        if encoding in seen:
+            return
+        seen.add(encoding)
+        output.append((encoding, confidence))
+        for similar in similar_encodings.get(encoding, []):
+            add(similar, None)
+
+    for encoding, confidence in encodings:
+        add(encoding, confidence)
+    return output
+
+
+def validate(
+    data: typing.Union[io.BytesIO, io.BufferedReader],
+    encodings: typing.List[str],
+    chunk_size: int = 65536,
+) -> typing.Optional[str]:
+    """
+    Reads 'data' once and feeds every chunk to an incremental decoder of each of the
+    'encodings'. Encodings are dropped as soon as they fail to decode a chunk or produce
+    invalid chars. Returns first of the remaining 'encodings' or None if none is left.
+    """
+    decoders = {}
+    for encoding in encodings:
+        try:
+            info = codecs.lookup(encoding)
+        except LookupError:
+            continue
+        if not getattr(info, "_is_text_encoding", True):
+            # Things like zlib or rot13
+            continue
+        decoders[encoding] = info.incrementaldecoder()
+
+    while decoders:
+        chunk = data.read(chunk_size)
+        for encoding, decoder in list(decoders.items()):
+            try:
+                text = decoder.decode(chunk, not chunk)
+            except UnicodeDecodeError:
+                del decoders[encoding]
+                continue
+            if any(char in text for char in invalid_chars):
+                del decoders[encoding]
+        if not chunk:
+            break
+    data.seek(0)
+
+    for encoding in encodings:
+        if encoding in decoders:
+            return encoding
+    return None
 
 
 def can_decode(data, encoding: typing.Optional[str]) -> bool:
-    reader = None
-    proper = False
-    try:
-        reader = io.TextIOWrapper(data, encoding, newline="")
-        proper = True
-        # Go through data
-        for line in reader:
-            for char in invalid_chars:
-                if char in line:
-                    proper = False
-                    break
-    except (UnicodeDecodeError, LookupError):
-        proper = False
-
-    if reader:
-        reader.detach()
+    if encoding is None:
+        encoding = locale.getpreferredencoding(False)
+    return validate(data, [encoding]) is not None
+
+
+def take_samples(
+    data: typing.Union[io.BytesIO, io.BufferedReader], sample_size: int
+) -> typing.Optional[typing.List[bytes]]:
+    """
+    Takes head, middle and tail samples of 'data' that together fit into 'sample_size'
+    bytes. Samples are trimmed to whole lines, so multibyte characters are not cut in
+    half. Returns None if the whole 'data' fits into 'sample_size'.
+    """
+    size = data.seek(0, io.SEEK_END)
+    data.seek(0)
+    if size <= sample_size:
+        return None
+
+    length = sample_size // 3
+    samples = []
+    for offset in (0, (size - length) // 2, size - length):
+        data.seek(offset)
+        sample = data.read(length)
+        if offset:
+            # Drop partial first line
+            start = sample.find(b"\n")
+            if start != -1:
+                sample = sample[start + 1 :]
+        if offset + length < size:
+            # Drop partial last line
+            end = sample.rfind(b"\n")
+            if end != -1:
+                sample = sample[: end + 1]
+        samples.append(sample)
+    data.seek(0)
+    return samples
+
+
+def detect_samples(
+    samples: typing.List[bytes],
+) -> typing.Optional[typing.Tuple[str, float]]:
+    """
+    Runs charset_normalizer over 'samples' and returns (encoding, confidence) if all
+    of them agree with at least 'sample_confidence'. Samples that are plain ASCII agree
+    with any encoding. Returns None as soon as one sample disagrees.
+    """
+    encoding: typing.Optional[str] = None
+    confidence = 1.0
+    for sample in samples:
+        detected = charset_normalizer.detect(sample)
+        if not detected or not detected["encoding"]:
+            return None
+        if (detected["confidence"] or 0.0) < sample_confidence:
+            return None
+        confidence = min(confidence, detected["confidence"] or 0.0)
+        if detected["encoding"] == "ascii":
+            continue
+        if encoding is None:
+            encoding = detected["encoding"]
+        elif codecs.lookup(encoding).name != codecs.lookup(detected["encoding"]).name:
+            return None
+    return (encoding or "ascii"), confidence
+
+
+def detect_unicode(
+    data: typing.Union[io.BytesIO, io.BufferedReader],
+) -> typing.Optional[str]:
+    """
+    Returns 'ascii' or 'utf-8' if 'data' is strictly such (and has no invalid chars),
+    None otherwise. Meant as a fast path ahead of statistical detection.
+    """
+    for chunk in iter(lambda: data.read(65536), b""):
+        if not chunk.isascii():
+            break
+    else:
+        data.seek(0)
+        return "ascii"
     data.seek(0)
-    return proper
+    return validate(data, ["utf-8"])
+
+
+class Detection(tuple):
+    """
+    Result of detect, a tuple (encoding, confidence). Its 'reason' tells why the encoding
+    was chosen, one of 'bom', 'cache', 'hint', 'language', 'similar', 'ascii', 'utf-8',
+    'samples' or 'detected'. Confidence of encoding detected from samples is the lowest
+    confidence of the samples, which is also kept in 'sample_confidence' (None for
+    encodings not detected from samples).
+    """
+
+    reason: str
+    sample_confidence: typing.Optional[float]
+
+    def __new__(
+        cls,
+        encoding: str,
+        confidence: typing.Optional[float],
+        reason: str,
+        sample_confidence: typing.Optional[float] = None,
+    ) -> "Detection":
+        obj = super(Detection, cls).__new__(cls, (encoding, confidence))
+        obj.reason = reason
+        obj.sample_confidence = sample_confidence
+        return obj
+
+    def __getnewargs__(self) -> typing.Tuple[typing.Any, ...]:
+        return self[0], self[1], self.reason, self.sample_confidence
+
+    def __repr__(self) -> str:
+        return "Detection({!r}, {!r}, {!r}, {!r})".format(
+            self[0], self[1], self.reason, self.sample_confidence
+        )
 
 
 def detect(
     data: typing.Union[io.BytesIO, io.BufferedReader],
     encoding: typing.Optional[str] = None,
     language: typing.Optional[str] = None,
-) -> typing.Tuple[str, typing.Optional[float]]:
+    sample_size: typing.Optional[int] = None,
+    cache: typing.Optional["DetectionCache"] = None,
+    priors: typing.Optional["EncodingPriors"] = None,
+) -> Detection:
     """
     Tries to detect encoding for specified 'data'. Will return a tuple (encoding, confidence).
     Confidence may be None, which means the encoding was detected from provided language or
-    encoding hint, or it stumbled over a unicode BOM.
+    encoding hint, or it stumbled over a unicode BOM. The tuple is a Detection and also
+    tells why the encoding was chosen.
+
+    Encoding hint and encodings guessed from 'language' (see guess_from_lang) are tried
+    first. Plain ASCII and valid UTF-8 are recognized without statistical detection.
+
+    If 'sample_size' is set and 'data' is larger, autodetection looks only at head, middle
+    and tail samples of 'data' (see take_samples). The whole 'data' is analysed only if
+    samples disagree or the encoding they agree on cannot decode 'data'. Confidence of
+    such detection is the lowest confidence of the samples, see
+    Detection.sample_confidence.
+
+    If 'cache' (a DetectionCache) is provided, results are looked up in it first and stored
+    in it after a successful detection.
     """
     if not isinstance(data, (io.BytesIO, io.BufferedReader)):
         raise TypeError("Needs to be a buffered file object.")
 
-    tried_encodings: typing.Set[str] = set()
-
     # Check for BOM (100% confidence)
     test_data = data.read(8)
     data.seek(0)
     if test_data.startswith(codecs.BOM_UTF8):
-        return "utf-8-sig", None
+        return Detection("utf-8-sig", None, "bom")
     elif test_data.startswith(codecs.BOM_UTF16):
-        return "utf16", None
+        return Detection("utf16", None, "bom")
+
+    if cache is not None:
+        key = cache.key(data, encoding, language, sample_size)
+        cached = cache.get(key)
+        if cached is not None:
+            return Detection(*cached, "cache")
+        result = detect(data, encoding, language, sample_size, priors=priors)
+        cache.set(key, *result)
+        return result
 
-    encodings = []
+    tried_encodings: typing.Set[str] = set()
+
+    def pick(
+        candidates: typing.List[typing.Tuple[str, typing.Optional[float]]],
+        reasons: typing.Dict[str, str],
+    ) -> typing.Optional[Detection]:
+        tried_encodings.update(i for i, _ in candidates)
+        found = validate(data, [i for i, _ in candidates])
+        if found is None:
+            return None
+        confidence = next(c for i, c in candidates if i == found)
+        return Detection(found, confidence, reasons.get(found, "similar"))
+
+    # Hints go first, statistics are needed only if none of them fits
+    reasons: typing.Dict[str, str] = {}
     if encoding:
-        encodings.append(encoding)
+        reasons[encoding] = "hint"
     if language:
-        encodings += guess_from_lang(language)
+        for guess in guess_from_lang(language, priors):
+            reasons.setdefault(guess, "language")
+    if reasons:
+        found = pick(with_similar([(i, None) for i in reasons]), reasons)
+        if found:
+            return found
+
+    # Cheap check before any statistics
+    unicode = detect_unicode(data)
+    if unicode and unicode not in tried_encodings:
+        return Detection(unicode, 1.0, unicode)
+
+    def detect_full() -> typing.Optional[typing.Tuple[str, typing.Optional[float]]]:
+        detected = charset_normalizer.detect(data.read())
+        data.seek(0)
+        if detected and detected["encoding"]:
+            return detected["encoding"], detected["confidence"]
+        return None
 
     # Autodetect encoding
-    detected = charset_normalizer.detect(data.read())
-    data.seek(0)
-    if detected and detected["encoding"]:
-        encodings.append((detected["encoding"], detected["confidence"]))
-    if not encodings:
+    samples = take_samples(data, sample_size) if sample_size else None
+    detected: typing.Optional[typing.Tuple[str, typing.Optional[float]]] = (
+        detect_samples(samples) if samples else None
+    )
+    sampled = detected is not None
+    if not sampled:
+        # Samples were either not taken or were inconclusive
+        detected = detect_full()
+    if not detected and not tried_encodings:
         raise EncodingError("Have no clue where to start.")
 
-    # Reverse order
-    encodings.reverse()
-    while True:
-        encoding: typing.Union[typing.Tuple[str, typing.Optional[float]], str] = (
-            encodings.pop()
-        )
-        if can_decode(
-            data, encoding if not isinstance(encoding, tuple) else encoding[0]
-        ):
-            # We've found it!
-            break
-        tried_encodings.add(
-            encoding if not isinstance(encoding, tuple) else encoding[0]
-        )
-
-        similar = similar_encodings.get(
-            encoding if not isinstance(encoding, tuple) else encoding[0]
-        )
-        if similar:
-            encodings += list(set(similar).difference(tried_encodings))
-        if not encodings:
-            # We lost :(
-            raise EncodingError(
-                "Could not detect proper encoding", list(tried_encodings)
+    found = None
+    if detected:
+        reason = "samples" if sampled else "detected"
+        found = pick(with_similar([detected], tried_encodings), {detected[0]: reason})
+        if found is not None and found.reason == "samples":
+            found.sample_confidence = detected[1]
+    if found is None and sampled:
+        # Samples misled us, look at everything
+        detected = detect_full()
+        if detected:
+            found = pick(
+                with_similar([detected], tried_encodings), {detected[0]: "detected"}
             )
+    if found is None:
+        # We lost :(
+        raise EncodingError("Could not detect proper encoding", list(tried_encodings))
 
-    if not isinstance(encoding, tuple):
-        encoding = (encoding, None)
-
-    return encoding
+    return found
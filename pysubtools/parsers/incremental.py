@@ -0,0 +1,103 @@
+import codecs
+import collections
+import itertools
+import re
+import typing
+
+
+class NeedMoreData(Exception):
+    """Raised when pushed data ran out before the end of it was reached."""
+
+
+class LineBuffer(object):
+    """
+    Decodes pushed bytes and splits them into lines the same way io.TextIOWrapper with
+    newline="" does. Parser reads from it like from a file object, until it runs out of
+    lines and raises NeedMoreData.
+    """
+
+    _line = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)")
+
+    def __init__(self, encoding: str, errors: str = "replace"):
+        self.set_encoding(encoding, errors)
+        self._text = ""
+        self._lines: typing.Deque[str] = collections.deque()
+        self.closed = False
+
+    def set_encoding(self, encoding: str, errors: str = "replace") -> None:
+        """Decodes data fed from now on with 'encoding'."""
+        self._encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+
+    def replace_errors(self) -> None:
+        """
+        Replaces undecodable bytes from now on. Decoding state is kept, so data of a
+        feed that failed can be fed again.
+        """
+        state = self._decoder.getstate()
+        self.set_encoding(self._encoding, "replace")
+        self._decoder.setstate(state)
+
+    def find(self, char: str) -> typing.Optional[typing.Tuple[int, int, str]]:
+        """
+        Returns (index, column, line) of the first 'char' in lines not read yet, where
+        'index' counts lines from the next one to be read. None if there is none.
+        """
+        for index, line in enumerate(itertools.chain(self._lines, [self._text])):
+            column = line.find(char)
+            if column != -1:
+                return index, column, line.rstrip()
+        return None
+
+    def _split(self, text: str, final: bool = False) -> None:
+        text = self._text + text
+        end = 0
+        for m in self._line.finditer(text):
+            if not final and m.end() == len(text) and text.endswith("\r"):
+                # Might be the first half of \r\n
+                break
+            self._lines.append(m.group(0))
+            end = m.end()
+        self._text = text[end:]
+
+    def feed(self, data: bytes) -> None:
+        self._split(self._decoder.decode(data))
+
+    def close(self) -> None:
+        """Marks end of data."""
+        self._split(self._decoder.decode(b"", True), final=True)
+        if self._text:
+            # Last line without line ending
+            self._lines.append(self._text)
+            self._text = ""
+        self.closed = True
+
+    def readline(self) -> str:
+        if self._lines:
+            return self._lines.popleft()
+        if self.closed:
+            return ""
+        raise NeedMoreData
+
+    def detach(self) -> None:
+        # Nothing underneath
+        pass
+
+
+async def achunks(
+    source: typing.Any, chunk_size: int = 65536
+) -> typing.AsyncIterator[bytes]:
+    """
+    Yields bytes chunks from 'source', which is either an asyncio.StreamReader (or
+    anything with a coroutine read method) or an async iterator of bytes.
+    """
+    if hasattr(source, "read"):
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        async for chunk in source:
+            if chunk:
+                yield chunk
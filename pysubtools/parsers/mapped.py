@@ -0,0 +1,68 @@
+import io
+import mmap
+import os
+import typing
+
+
+class MappedFile(io.RawIOBase):
+    """
+    Read-only raw file object over a memory mapped file. Reads copy straight from the
+    mapping and seeks are free, so rewinds and sampled encoding detection of large
+    files do not go through the whole file.
+    """
+
+    def __init__(self, path: typing.Union[str, "os.PathLike[str]"]):
+        super(MappedFile, self).__init__()
+        self.name = os.fspath(path)
+        self._map: typing.Optional[mmap.mmap] = None
+        self._position = 0
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                # The mapping stays valid after the file is closed
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._map) if self._map is not None else 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: typing.Any) -> int:
+        if self._map is None:
+            return 0
+        with memoryview(buffer) as target, memoryview(self._map) as source:
+            with source[self._position : self._position + target.nbytes] as chunk:
+                size = chunk.nbytes
+                target.cast("B")[:size] = chunk
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self)
+        if offset < 0:
+            raise ValueError("Negative seek position {}".format(offset))
+        self._position = offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        super(MappedFile, self).close()
+
+
+def open_mapped(
+    path: typing.Union[str, "os.PathLike[str]"],
+    buffer_size: int = io.DEFAULT_BUFFER_SIZE,
+) -> io.BufferedReader:
+    """Opens file on 'path' as memory mapped and buffered."""
+    return io.BufferedReader(MappedFile(path), buffer_size)
@@ -1,6 +1,8 @@
+import collections
 import re
 
 from .base import Parser
+from .incremental import NeedMoreData
 from ..subtitle import Frame, SubtitleLine
 
 
@@ -13,6 +15,11 @@ def update_dict(d, s):
             d[key] = s[key]
 
 
+def copy_dict(d):
+    """Copy with recursion."""
+    return {k: copy_dict(v) if isinstance(v, dict) else v for k, v in d.items()}
+
+
 class MicroDVDParser(Parser):
     """Parser for SubRip."""
 
@@ -22,6 +29,15 @@ class MicroDVDParser(Parser):
         re.M,
     )
     HEADER_RE = re.compile(r"^\{DEFAULT\}(?P<header>(:?\{[^}]+\})*)$")
+    # First line may declare frame rate, like {1}{1}23.976
+    FPS_RE = re.compile(r"^\{[01]\}\{[01]\}(?P<fps>\d+(?:[.,]\d+)?)$")
+    # How many resolved headers are kept
+    HEADER_CACHE = 256
+
+    def __init__(self, **kwargs):
+        super(MicroDVDParser, self).__init__(**kwargs)
+        # Resolved headers and their warnings, least recently used first
+        self._headers = collections.OrderedDict()
 
     @classmethod
     def _can_parse(cls, data):
@@ -37,8 +53,12 @@ class MicroDVDParser(Parser):
         data.seek(0)
         return can
 
-    def _parse_header(self, header, global_only=False):
-        # TODO Add FPS heuristic (first line as fps)
+    def _parse_header(self, header, global_only=False, messages=None):
+        def warn(*args):
+            if messages is not None:
+                messages.append(args)
+            self._warn(*args)
+
         output = {"local": {}}
         #################################################################
         # Supported header tags (lowercase represent global and local): #
@@ -77,12 +97,7 @@ class MicroDVDParser(Parser):
                     elif i == "s":
                         t["styles"]["*"]["text-decoration"].append("line-through")
                     else:
-                        self.add_warning(
-                            self._current_line_num + 1,
-                            1,
-                            self._fetch_line(self._current_line_num),
-                            "Unknown style tag {}.".format(i),
-                        )
+                        warn("Unknown style tag {}.", i)
                 t["styles"]["*"]["text-decoration"] = " ".join(
                     t["styles"]["*"]["text-decoration"]
                 )
@@ -100,34 +115,19 @@ class MicroDVDParser(Parser):
                 if re.match("^\$[0-9a-fA-F]{6}$", v):
                     t["styles"]["*"]["color"] = "#" + v[5:] + v[3:5] + v[1:3]
                 else:
-                    self.add_warning(
-                        self._current_line_num + 1,
-                        1,
-                        self._fetch_line(self._current_line_num),
-                        "Wrong color format {}.".format(v),
-                    )
+                    warn("Wrong color format {}.", v)
             elif k == "P":
                 # Position
                 m = re.match(r"^\s*(\d+)\s*,\s*(\d+)\s*$", v)
                 if not m:
-                    self.add_warning(
-                        self._current_line_num + 1,
-                        1,
-                        self._fetch_line(self._current_line_num),
-                        "Malformed position {}.".format(v),
-                    )
+                    warn("Malformed position {}.", v)
                 else:
                     t["position"] = {"x": int(m.group(1)), "y": int(m.group(2))}
             elif k == "H":
                 # Silently ignore since it is charset setting
                 pass
             else:
-                self.add_warning(
-                    self._current_line_num + 1,
-                    1,
-                    self._fetch_line(self._current_line_num),
-                    "Unknwon header {}.".format(k),
-                )
+                warn("Unknwon header {}.", k)
 
             if not t["styles"]["*"]["text-decoration"]:
                 del t["styles"]["*"]["text-decoration"]
@@ -142,6 +142,27 @@ class MicroDVDParser(Parser):
 
         return output
 
+    def _resolve_header(self, key):
+        """
+        Same as _parse_header for 'key', a header or a sorted tuple of its tag and
+        value pairs. Results are cached and every use gets its own copy, warnings are
+        repeated for every use.
+        """
+        try:
+            output, messages = self._headers[key]
+        except KeyError:
+            messages = []
+            header = key if isinstance(key, str) else self._from_header_dict(dict(key))
+            output = self._parse_header(header, messages=messages)
+            self._headers[key] = output, messages
+            if len(self._headers) > self.HEADER_CACHE:
+                self._headers.popitem(last=False)
+        else:
+            self._headers.move_to_end(key)
+            for args in messages:
+                self._warn(*args)
+        return copy_dict(output)
+
     def _to_header_dict(self, h):
         if not h:
             return {}
@@ -154,13 +175,13 @@ class MicroDVDParser(Parser):
             return {(k, v) for k, v in d.items() if k.islower()}
         except ValueError:
             # Cannot parse this header, probably it is wrong
-            line = self._fetch_line(self._current_line_num)
-            self.add_warning(
-                self._current_line_num + 1,
-                line.index(h),
-                line,
-                "It looks like a line header but it's not.",
-            )
+            if not self.quiet:
+                line = self._fetch_line(self._current_line_num)
+                self._warn(
+                    "It looks like a line header but it's not.",
+                    column=line.index(h),
+                    line=line,
+                )
             return {}
 
     def _from_header_dict(self, h):
@@ -168,25 +189,48 @@ class MicroDVDParser(Parser):
             return ""
         return "{" + "}{".join([":".join([k, v]) for k, v in h.items()]) + "}"
 
-    def _parse_metadata(self):
-        # Need for default header lines
-        self._skip_lines = set([])
+    def _detect_fps(self):
+        """Returns frame rate declared on the current line, if it is the first one."""
+        if self._current_line_num != 0:
+            return None
+        m = self.FPS_RE.match(self._current_line.strip())
+        if not m:
+            return None
+        fps = float(m.group("fps").replace(",", "."))
+        # Anything else is a unit with a number
+        return fps if 1 <= fps <= 240 else None
+
+    def _parse(self, fps=None, **kwargs):
+        """
+        Timings are in seconds at 'fps', or at the frame rate declared on the first
+        line, otherwise they are kept as frames. The rate used is kept as 'fps' in the
+        metadata, a declared one also as 'declared_fps'.
+        """
+        # Headers resolved for previous data
+        self._headers.clear()
+        if fps:
+            self.metadata["fps"] = fps
+        while True:
+            try:
+                if not self._next_line():
+                    break
+            except NeedMoreData:
+                # Wait for more data
+                yield None
+                continue
+
+            detected = self._detect_fps()
+            if detected:
+                self.metadata["declared_fps"] = detected
+                fps = self.metadata["fps"] = fps or detected
+                continue
 
-        output = {}
-        # Scan the whole subtitle for global metadata
-        while self._next_line():
             m = self.HEADER_RE.match(self._current_line.strip())
             if m:
-                output.update(self._parse_header(m.group("header"), global_only=True))
-                self._skip_lines.add(self._current_line_num)
-        # Rewind
-        self._rewind()
-        return output
-
-    def _parse(self, fps=None, **kwargs):
-        while self._next_line():
-            if self._current_line_num in self._skip_lines:
-                # We have a metadata line
+                # Global metadata can be anywhere between units
+                self.metadata.update(
+                    self._parse_header(m.group("header"), global_only=True)
+                )
                 continue
 
             m = self.FORMAT_RE.match(self._current_line.strip())
@@ -199,12 +243,7 @@ class MicroDVDParser(Parser):
                 )
             else:
                 if not m.group("text"):
-                    self.add_warning(
-                        self._current_line_num + 1,
-                        1,
-                        self._fetch_line(self._current_line_num),
-                        "Empty unit.",
-                    )
+                    self._warn("Empty unit.")
 
                 start, end = int(m.group("start")), int(m.group("end"))
                 if fps:
@@ -213,7 +252,7 @@ class MicroDVDParser(Parser):
                 else:
                     start, end = Frame(start), Frame(end)
                 # Parse main header
-                header = self._parse_header(m.groupdict().get("header", ""))
+                header = self._resolve_header(m.group("header"))
                 h_inherit = [self._to_header_dict(m.groupdict().get("header", ""))]
                 # Go through lines and parse out headers
                 lines = []
@@ -230,7 +269,7 @@ class MicroDVDParser(Parser):
                     h = {}
                     for i in h_inherit:
                         h.update(i)
-                    h = self._parse_header(self._from_header_dict(h))["local"]
+                    h = self._resolve_header(tuple(sorted(h.items())))["local"]
 
                     # Construct line
                     lines.append(SubtitleLine(line[h_i:], **h))
@@ -241,7 +280,6 @@ class MicroDVDParser(Parser):
                     "lines": lines,
                 }
                 # Add unit metadata
-                header.pop("local")
-                data.update(header)
+                data.update((k, v) for k, v in header.items() if k != "local")
                 # Pass along the unit data
                 yield {"data": data}
@@ -0,0 +1,73 @@
+"""
+Per-language encoding priors, learned from a local corpus of labelled subtitles.
+The corpus is a directory with one subdirectory per ISO-639-1 language, each holding
+one subdirectory per encoding with the subtitle files, e.g. 'corpus/sl/windows-1250/'.
+Build and save the priors with:
+
+    python -m pysubtools.parsers.build_priors corpus priors.json
+"""
+
+import codecs
+import json
+import os
+import typing
+
+from . import encodings
+
+
+class EncodingPriors(object):
+    """How often each encoding was seen for each language."""
+
+    def __init__(self, counts: typing.Dict[str, typing.Dict[str, int]]):
+        self.counts = counts
+        # Most likely first
+        self._ordered = {
+            language: sorted(c.items(), key=lambda i: (-i[1], i[0]))
+            for language, c in counts.items()
+        }
+
+    def guess(self, language: str, min_share: float = 0.01) -> typing.List[str]:
+        """
+        Returns encodings for 'language', most likely first. Encodings seen in less than
+        'min_share' of the language's subtitles are left out.
+        """
+        ordered = self._ordered.get(language)
+        if not ordered:
+            return []
+        total = sum(count for _, count in ordered)
+        return [encoding for encoding, count in ordered if count >= total * min_share]
+
+    @classmethod
+    def build(cls, root: str) -> "EncodingPriors":
+        """
+        Builds priors from corpus in 'root'. Files that do not decode with the encoding
+        they are labelled with are not counted.
+        """
+        counts: typing.Dict[str, typing.Dict[str, int]] = {}
+        for language in sorted(os.listdir(root)):
+            if not os.path.isdir(os.path.join(root, language)):
+                continue
+            for label in sorted(os.listdir(os.path.join(root, language))):
+                directory = os.path.join(root, language, label)
+                if not os.path.isdir(directory):
+                    continue
+                try:
+                    encoding = codecs.lookup(label).name
+                except LookupError:
+                    continue
+                for filename in os.listdir(directory):
+                    with open(os.path.join(directory, filename), "rb") as f:
+                        if encodings.validate(f, [encoding]) is None:
+                            continue
+                    language_counts = counts.setdefault(language, {})
+                    language_counts[encoding] = language_counts.get(encoding, 0) + 1
+        return cls(counts)
+
+    @classmethod
+    def load(cls, path: str) -> "EncodingPriors":
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.counts, f, sort_keys=True, separators=(",", ":"))
@@ -0,0 +1,71 @@
+import collections
+import time
+import typing
+
+
+class ParseStats(object):
+    """
+    Opt-in statistics of parsing, pass it to the parser as 'stats'. Collects wall time
+    and input bytes per phase (sniff, detect, metadata, parse, units, build), counts
+    of lines and units, and messages by description. If set, 'callback' is called
+    with the phase name and the stats every time a phase ends.
+
+    Phases parse (the format's own parsing), units (SubtitleUnit construction) and
+    build (Subtitle.append) interleave, so their time is summed over all units and
+    they end together once all units are parsed.
+    """
+
+    def __init__(
+        self,
+        callback: typing.Optional[typing.Callable[[str, "ParseStats"], None]] = None,
+    ):
+        self.callback = callback
+        self.times: typing.Dict[str, float] = collections.defaultdict(float)
+        self.sizes: typing.Counter[str] = collections.Counter()
+        self.counts: typing.Counter[str] = collections.Counter()
+        self.warnings: typing.Counter[str] = collections.Counter()
+        self.errors: typing.Counter[str] = collections.Counter()
+
+    def measure(self, phase: str, func: typing.Callable, *args, **kwargs) -> typing.Any:
+        """Calls 'func' and adds its time to 'phase'."""
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.times[phase] += time.perf_counter() - start
+
+    def timed(self, phase: str, func: typing.Callable) -> typing.Callable:
+        """Returns 'func' that adds its time to 'phase' and counts successful calls."""
+
+        def timed_func(*args, **kwargs):
+            result = self.measure(phase, func, *args, **kwargs)
+            self.counts[phase] += 1
+            return result
+
+        return timed_func
+
+    def timed_iter(self, phase: str, iterable: typing.Iterable) -> typing.Iterator:
+        """Iterates over 'iterable' and adds time spent in it to 'phase'."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.times[phase] += time.perf_counter() - start
+            yield item
+
+    def end(self, phase: str, size: int = 0) -> None:
+        """Ends 'phase' that went through 'size' bytes of input."""
+        if size:
+            self.sizes[phase] += size
+        if self.callback is not None:
+            self.callback(phase, self)
+
+    def count(self, parser: typing.Any) -> None:
+        """Counts lines and messages of 'parser'."""
+        self.counts["lines"] = parser._current_line_num + 1
+        self.warnings = collections.Counter(parser.diagnostics["warning"].counts)
+        self.errors = collections.Counter(parser.diagnostics["error"].counts)
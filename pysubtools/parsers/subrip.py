@@ -1,3 +1,7 @@
+import collections
+import concurrent.futures
+import io
+import itertools
 import re
 from state_machine import (
     acts_as_state_machine,
@@ -8,7 +12,13 @@ from state_machine import (
     InvalidStateTransition,
 )
 
-from .base import Parser
+from .base import Parser, ParseError
+from ..subtitle import LazySubtitleLines
+from ..timestamps import parse_time, to_seconds
+from .incremental import NeedMoreData
+
+# Warned at the end of the last line read, parse_parallel moves it on merge
+MISSING_LINE = "Missing empty line after unit."
 
 
 @acts_as_state_machine
@@ -43,11 +53,13 @@ class SubRipStateMachine(object):
     # Tagged properties
     _tag_position = re.compile(r"\s*\\pos\(\s*(\d+)\s*,\s*(\d+)\s*\)\s*")
 
-    def __init__(self, parser):
+    def __init__(self, parser, first_sequence=1):
         self.parser = parser
         self._parsed = None
         self.temp = None
         self.paused = False
+        # Sequence number of the last unit
+        self.sequence = first_sequence - 1
 
     @property
     def read_lines(self):
@@ -106,18 +118,27 @@ class SubRipStateMachine(object):
 
     @before("found_sequence")
     def validate_unit(self):
-        previous_seq = self.temp["sequence"] if self.temp else 0
+        previous_seq = self.sequence
 
         sequence = int(self.current_line.strip())
+        checks = self.parser._sequence_checks
+        if checks is not None and (
+            not checks or checks[-1][1] != self.current_line_num + 1
+        ):
+            # Position in warnings, line number, line, found and expected sequence
+            checks.append(
+                (
+                    len(self.parser.diagnostics["warning"]),
+                    self.current_line_num + 1,
+                    self.fetch_line(self.current_line_num),
+                    sequence,
+                    previous_seq + 1,
+                )
+            )
         if sequence - previous_seq != 1:
             self.pause()
             self.current_line = str(previous_seq + 1)
-            self.parser.add_warning(
-                self.current_line_num + 1,
-                1,
-                self.fetch_line(self.current_line_num),
-                "Sequence number out of sync",
-            )
+            self.parser._warn("Sequence number out of sync")
             raise self.Skip
 
         if self.current_state == self.unit_text:
@@ -127,57 +148,44 @@ class SubRipStateMachine(object):
     @after("found_sequence")
     def create_unit(self):
         self._parsed = self.temp
+        self.sequence = int(self.current_line.strip())
         self.temp = {
-            "sequence": int(self.current_line.strip()),
+            "sequence": self.sequence,
             "data": {"lines": []},
         }
 
     @before("found_header")
     def validate_header(self):
         if self.is_unit_text:
-            self.parser.add_warning(
-                self.current_line_num + 1,
-                1,
-                self.current_line,
-                "Duplicated time information, ignoring.",
+            self.parser._warn(
+                "Duplicated time information, ignoring.", line=self.current_line
             )
             raise self.Skip
         if self.is_start:
             self.fix_sequence_skip()
-            self.parser.add_warning(
-                self.current_line_num + 1,
-                1,
-                self.current_line,
-                "New unit starts without a sequence.",
+            self.parser._warn(
+                "New unit starts without a sequence.", line=self.current_line
             )
 
         if "." in self.current_line:
             # Stay on same line
             self.pause()
-            original = self.fetch_line(self.current_line_num)
             col = self.current_line.index(".")
             self.current_line = self.current_line.replace(".", ",", 1)
-            self.parser.add_warning(
-                self.current_line_num + 1,
-                col + 1,
-                original,
-                "Used dot as decimal separator instead of comma.",
+            self.parser._warn(
+                "Used dot as decimal separator instead of comma.", column=col + 1
             )
             raise self.Skip
         # Re-check header
         m = self._header.match(self.current_line)
         if m.group(2):
-            original = self.fetch_line(self.current_line_num)
             # Found garbage
             column = self.current_line.index(m.group(2)) + 1
             self.current_line = m.group(1)
             # Re-try
             self.pause()
-            self.parser.add_warning(
-                self.current_line_num + 1,
-                column,
-                original,
-                "Header has unrecognized content at the end.",
+            self.parser._warn(
+                "Header has unrecognized content at the end.", column=column
             )
             raise self.Skip
 
@@ -204,17 +212,18 @@ class SubRipStateMachine(object):
         start = self._time.match(start.strip())
         end = self._time.match(end.strip())
 
-        start, end = start.group(0).split(":"), end.group(0).split(":")
-
-        def convert(x):
-            return int(x[0]) * 3600 + int(x[1]) * 60 + float(x[2].replace(",", "."))
-
-        self.temp["data"].update(dict(start=convert(start), end=convert(end)))
+        self.temp["data"].update(
+            dict(
+                start=to_seconds(parse_time(start.group(0))),
+                end=to_seconds(parse_time(end.group(0))),
+            )
+        )
 
     def fix_sequence_skip(self):
         self._parsed = self.temp
+        self.sequence += 1
         self.temp = {
-            "sequence": (self.temp["sequence"] if self.temp else 0) + 1,
+            "sequence": self.sequence,
             "data": {"lines": []},
         }
 
@@ -223,14 +232,9 @@ class SubRipStateMachine(object):
         if self.is_start:
             if self.temp:
                 # Add empty line
-                self.temp["data"]["lines"] += [""]
+                self.temp["data"]["lines"].append("")
             else:
-                self.parser.add_warning(
-                    self.current_line_num + 1,
-                    1,
-                    self.current_line,
-                    "Junk before first unit.",
-                )
+                self.parser._warn("Junk before first unit.", line=self.current_line)
                 raise self.Skip
 
     @after("found_text")
@@ -250,16 +254,11 @@ class SubRipStateMachine(object):
                 }
                 tagged = tagged.replace(pos.group(0), "", 1)
 
-        self.temp["data"]["lines"] += [i.rstrip() for i in self.current_line.split("|")]
+        self.temp["data"]["lines"].append(self.current_line)
 
         # Unknown TAG headers
         if tagged:
-            self.parser.add_warning(
-                self.current_line_num + 1,
-                1,
-                self.fetch_line(self.current_line_num),
-                "Tagged header not fully parsed.",
-            )
+            self.parser._warn("Tagged header not fully parsed.")
             raise self.Skip
 
     @before("found_empty")
@@ -267,22 +266,12 @@ class SubRipStateMachine(object):
         if self.current_state == self.start:
             if self.temp:
                 # Add empty line to text (since previous line was a text)
-                self.temp["data"]["lines"] += [""]
+                self.temp["data"]["lines"].append("")
             else:
-                self.parser.add_warning(
-                    self.current_line_num + 1,
-                    1,
-                    self.fetch_line(self.current_line_num),
-                    "Have empty line before first unit.",
-                )
+                self.parser._warn("Have empty line before first unit.")
                 raise self.Skip
         elif self.is_unit:
-            self.parser.add_warning(
-                self.current_line_num + 1,
-                1,
-                self.fetch_line(self.current_line_num),
-                "Have empty line between sequence number and timings.",
-            )
+            self.parser._warn("Have empty line between sequence number and timings.")
             raise self.Skip
 
     @after("found_empty")
@@ -298,13 +287,7 @@ class SubRipStateMachine(object):
         self._parsed = self.temp
         self.temp = None
         if self._missing_line:
-            original = self.fetch_line(self.current_line_num)
-            self.parser.add_warning(
-                self.current_line_num + 1,
-                len(self.current_line),
-                original,
-                "Missing empty line after unit.",
-            )
+            self.parser._warn(MISSING_LINE, column=len(self.current_line))
             raise self.Skip
 
     def parsed(self):
@@ -320,6 +303,43 @@ class SubRipParser(Parser):
 
     FORMAT = "SubRip"
     FORMAT_RE = re.compile(r"^(?:[^:]+:){2}[^- ]+\s+-->\s+(?:[^:]+:){2}.*$")
+    # Sequence number of the last parsed unit
+    _last_sequence = 0
+    # Whether the data ended between units, kept only for parse_parallel
+    _ended_in_start = True
+    # Sequence number checks, kept only for parse_parallel
+    _sequence_checks = None
+
+    ENGINES = ("machine", "regex")
+    # Longest cue the regex engine looks for
+    CUE_LINES = 32
+    # Usual well formed cue, up to and with the blank line after it. Anything that
+    # would make the state machine warn or change the unit does not match.
+    _cue = re.compile(
+        r"[^\S\r\n]*(\d+)[^\S\r\n]*(?:\r\n|\r|\n)"
+        r"[^\S\r\n]*(\d{1,2}:\d{1,2}:\d{1,2},\d{1,3})[^\S\r\n]*-->"
+        r"[^\S\r\n]*(\d{1,2}:\d{1,2}:\d{1,2},\d{1,3})[^\S\r\n]*(?:\r\n|\r|\n)"
+        # Text lines, without timings or tagged headers
+        r"(?:(?![^\S\r\n]*[0-9:,.]+[^\S\r\n]*-->[^\S\r\n]*[0-9:,.])(?!\{[^}\r\n]*\})"
+        r"[^\S\r\n]*\S[^\r\n]*(?:\r\n|\r|\n))+"
+        r"(?:[^\S\r\n]*(?:\r\n|\r|\n)|[^\S\r\n]+)"
+    )
+
+    def __init__(self, engine="machine", lazy=False, **kwargs):
+        """
+        Parser 'engine' is either "machine", going line by line through
+        SubRipStateMachine, or "regex", matching well formed cues as a whole and
+        leaving the rest to the state machine. Both give the same results. If 'lazy',
+        units keep the lines they were parsed from and build their SubtitleLines only
+        when they are first used.
+        """
+        super(SubRipParser, self).__init__(**kwargs)
+        if engine not in self.ENGINES:
+            raise ValueError("Unknown engine '{}'.".format(engine))
+        self.engine = engine
+        self.lazy = lazy
+        # Lines read by the regex engine, but not parsed yet
+        self._lookahead = collections.deque()
 
     @classmethod
     def _can_parse(cls, data):
@@ -336,22 +356,34 @@ class SubRipParser(Parser):
         data.seek(0)
         return can
 
-    def _parse(self, **kwargs):
-        machine = SubRipStateMachine(self)
+    def _parse(self, first_sequence=1, **kwargs):
+        machine = SubRipStateMachine(self, first_sequence)
+        scan = self.engine == "regex"
 
         # We have a state machine. Let us start.
         while True:
             try:
+                if scan and machine.is_start and not machine.paused:
+                    rest = self._scan_cue(machine)
+                    if rest:
+                        parsed = machine.parsed()
+                        if parsed:
+                            yield self._split(parsed)
+                        self._take_lines(rest)
+                        continue
                 if machine.current_state != machine.finished:
                     machine.iterate()
                 parsed = machine.parsed()
                 if parsed:
-                    yield parsed
+                    yield self._split(parsed)
                 if machine.current_state == machine.finished:
                     break
             except SubRipStateMachine.Skip:
                 # Just skip
                 pass
+            except NeedMoreData:
+                # Wait for more data, the line was not consumed yet
+                yield None
             except InvalidStateTransition:
                 self.add_error(
                     machine.current_line_num + 1,
@@ -359,3 +391,282 @@ class SubRipParser(Parser):
                     machine.current_line,
                     "Unparsable line",
                 )
+        self._last_sequence = machine.sequence
+        self._ended_in_start = not machine._missing_line
+
+    def _split(self, parsed):
+        """Turns source lines of a parsed unit into texts of its lines."""
+        data = parsed["data"]
+        if self.lazy:
+            data["lines"] = LazySubtitleLines(data["lines"], split_lines)
+        else:
+            data["lines"] = split_lines(data["lines"])
+        return parsed
+
+    def _next_line(self):
+        if not self._lookahead:
+            return super(SubRipParser, self)._next_line()
+        self._take_lines(1)
+        return True
+
+    def _take_lines(self, count):
+        """Moves 'count' lines from lookahead to read lines."""
+        lines = [self._lookahead.popleft() for _ in range(count)]
+        self._current_line_num += count
+        self._read_lines.extend(lines)
+        self._current_line = lines[-1].rstrip()
+
+    def _fill_lookahead(self, count):
+        """Reads lines until there are 'count' of them in lookahead, False on the end."""
+        while len(self._lookahead) < count:
+            line = self._data.readline() if self._data else None
+            if not line:
+                return False
+            self._lookahead.append(line)
+        return True
+
+    def _scan_cue(self, machine):
+        """
+        Parses a well formed cue from the lookahead, if there is one, and leaves the
+        state machine as if it parsed its sequence number, holding on to the cue and
+        with the unit it was holding on to parsed. Returns the number of lines of the
+        cue left in the lookahead, 0 if no cue was found.
+        """
+        lookahead = self._lookahead
+        # Cheap check of the sequence number first
+        if not self._fill_lookahead(1):
+            return 0
+        if not machine._sequence.match(lookahead[0]):
+            return 0
+
+        # Find the blank line after the cue
+        blank = 2
+        while True:
+            if blank >= self.CUE_LINES or not self._fill_lookahead(blank + 1):
+                return 0
+            if not lookahead[blank].strip():
+                break
+            blank += 1
+
+        m = self._cue.fullmatch("".join(itertools.islice(lookahead, blank + 1)))
+        if not m:
+            return 0
+
+        lines = list(itertools.islice(lookahead, 2, blank))
+
+        found, expected = int(lookahead[0]), machine.sequence + 1
+        if self._sequence_checks is not None:
+            self._sequence_checks.append(
+                (
+                    len(self.diagnostics["warning"]),
+                    self._current_line_num + 2,
+                    lookahead[0].rstrip(),
+                    found,
+                    expected,
+                )
+            )
+        self._take_lines(1)
+        if found != expected:
+            self._warn("Sequence number out of sync")
+            machine.current_line = str(expected)
+        # Same as SubRipStateMachine.create_unit and the rest of the cue would do, the
+        # cue is held on to in case text continues after the blank line
+        machine.sequence = expected
+        machine._parsed = machine.temp
+        machine.temp = {
+            "sequence": machine.sequence,
+            "data": {
+                "lines": lines,
+                "start": to_seconds(parse_time(m.group(2))),
+                "end": to_seconds(parse_time(m.group(3))),
+            },
+        }
+        return blank
+
+    @classmethod
+    def _can_split(cls, lines, index):
+        """
+        Checks if parsing can start fresh on line 'index', a unit after blank lines. The
+        unit must not follow a lone sequence number, the parser would be inside it.
+        Malformed units before may still leave the parser inside one, parse_parallel
+        then parses the chunks on both sides together.
+        """
+        machine = SubRipStateMachine
+        if not (
+            index + 1 < len(lines)
+            and machine._sequence.match(lines[index])
+            and machine._header.match(lines[index + 1])
+            and not lines[index - 1].strip()
+        ):
+            return False
+        previous = index - 1
+        while previous >= 0 and not lines[previous].strip():
+            previous -= 1
+        return previous >= 0 and not machine._sequence.match(lines[previous])
+
+    def parse_parallel(
+        self,
+        data=None,
+        encoding=None,
+        language=None,
+        sample_size=None,
+        cache=None,
+        priors=None,
+        workers=None,
+        chunk_size=20000,
+    ):
+        """
+        Same as parse, but splits the subtitle into chunks of about 'chunk_size' lines
+        on unit boundaries and parses them in a pool of 'workers' processes. Results are
+        the same as of the serial parse.
+        """
+        from .. import Subtitle
+
+        if data:
+            self._set_data(data, encoding, language, sample_size, cache, priors)
+        self._read_metadata()
+        lines = io.StringIO(self._data.read(), newline="").readlines()
+
+        # Find chunk boundaries
+        starts = [0]
+        index = chunk_size
+        while index < len(lines):
+            if self._can_split(lines, index):
+                starts.append(index)
+                index += chunk_size
+            else:
+                index += 1
+        # First sequence number of a chunk is a guess, it is fixed when merging
+        chunks = [
+            ("".join(lines[start:end]), start, int(lines[start]) if start else 1)
+            for start, end in zip(starts, starts[1:] + [len(lines)])
+        ]
+        del lines
+
+        options = dict(
+            stop_level=self._stop_level,
+            quiet=self.quiet,
+            engine=self.engine,
+            lazy=self.lazy,
+        )
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_parse_chunk, text, start, sequence, options)
+                for text, start, sequence in chunks
+            ]
+            sub = Subtitle(**self.metadata)
+            sequence = 0
+            index = 0
+            while index < len(chunks):
+                text, start, guess = chunks[index]
+                result = futures[index].result()
+                shift = sequence - guess + 1
+                if shift and self._stop_level == "warning":
+                    # Would stop on a different warning
+                    result = _parse_chunk(text, start, sequence + 1, options)
+                    shift = 0
+                while not result[-2] and index + 1 < len(chunks):
+                    # Chunk ended inside a unit, parse it together with the next one
+                    index += 1
+                    futures[index].cancel()
+                    text += chunks[index][0]
+                    result = _parse_chunk(text, start, sequence + 1, options)
+                    shift = 0
+                try:
+                    sequence = self._merge_chunk(sub, result, shift)
+                except ParseError:
+                    for future in futures:
+                        future.cancel()
+                    raise
+                index += 1
+        return sub
+
+    def _merge_chunk(self, sub, result, shift):
+        """
+        Adds units and messages of a parsed chunk. Sequence numbers of the chunk are off
+        by 'shift', so sequence number warnings are redone, and so are sequence numbers
+        the parser put in place of wrong ones, which errors quote and missing empty line
+        warnings are placed after. Returns the last sequence.
+        """
+        units, warnings, errors, checks, sequence, line_num, _, exception = result
+        for unit in units:
+            sub.append(unit)
+
+        # Warnings to drop and to add before the warning at their position
+        dropped = set()
+        added = collections.defaultdict(list)
+        # Sequence lines as seen in the chunk and as seen by the serial parse
+        replaced = {}
+        if shift:
+            for position, line_number, line, found, expected in checks or ():
+                if found != expected:
+                    dropped.add(position)
+                if found != expected + shift:
+                    added[position].append(
+                        (line_number, 1, line, "Sequence number out of sync")
+                    )
+                replaced[line_number] = (
+                    str(expected) if found != expected else line,
+                    str(expected + shift) if found != expected + shift else line,
+                )
+
+        for position in range(len(warnings) + 1):
+            for args in added.get(position, ()):
+                self.diagnostics["warning"].add(*args)
+            if position < len(warnings) and position not in dropped:
+                msg = warnings[position]
+                column = msg["col"]
+                if (
+                    msg["line_number"] in replaced
+                    and msg["description"] == MISSING_LINE
+                ):
+                    # Reported at the end of the sequence line the parser put in
+                    column = len(replaced[msg["line_number"]][1])
+                self.diagnostics["warning"].add(
+                    msg["line_number"], column, msg["line"], msg["description"]
+                )
+        for msg in errors:
+            line = msg["line"]
+            chunk_line, serial_line = replaced.get(msg["line_number"], (None, None))
+            if line == chunk_line:
+                line = serial_line
+            self.diagnostics["error"].add(
+                msg["line_number"], msg["col"], line, msg["description"]
+            )
+
+        self._current_line_num = line_num
+        if exception is not None:
+            raise exception
+        return sequence + shift
+
+
+def split_lines(lines):
+    """Splits SubRip text 'lines' on "|" and strips them."""
+    return [i.rstrip() for line in lines for i in line.rstrip().split("|")]
+
+
+def _parse_chunk(text, first_line, first_sequence, options):
+    """Parses a chunk of SubRip 'text' that starts on line 'first_line'."""
+    parser = SubRipParser(**options)
+    parser._data = io.StringIO(text, newline="")
+    parser._current_line_num = first_line - 1
+    if not parser.quiet:
+        parser._sequence_checks = []
+    units = []
+    exception = None
+    try:
+        for unit in parser._iter_units(first_sequence=first_sequence):
+            units.append(unit)
+    except ParseError as e:
+        exception = e
+
+    return (
+        units,
+        parser.warnings,
+        parser.errors,
+        parser._sequence_checks,
+        parser._last_sequence,
+        parser._current_line_num,
+        parser._ended_in_start,
+        exception,
+    )
@@ -1,6 +1,11 @@
+import array
+import bisect
+import functools
 import io
 import typing
+import weakref
 import yaml
+from .timestamps import frames_to_seconds, parse_time, to_seconds
 from .utils import UnicodeMixin
 
 
@@ -29,7 +34,7 @@ class HumanTime(yaml.YAMLObject, UnicodeMixin):
         cls, loader: yaml.Loader, node: typing.Union[yaml.ScalarNode, yaml.MappingNode]
     ) -> float:
         value = loader.construct_scalar(node)
-        return float(cls.from_string(value))
+        return to_seconds(parse_time(value))
 
     @classmethod
     def to_yaml(
@@ -125,25 +130,69 @@ class Frame(yaml.YAMLObject, UnicodeMixin):
         return "Frame({})".format(self._frame)
 
 
-class SubtitleLine(UnicodeMixin):
+# Sets slots past MetaSlots.__setattr__
+_set_slot = object.__setattr__
+
+
+class MetaSlots(object):
+    """
+    Base for classes with fixed fields in __slots__. Any other attribute is metadata,
+    kept in a side dict that is only allocated when there is some.
+    """
+
+    __slots__ = ("_meta",)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        # Only called when there is no such slot
+        if name != "_meta":
+            meta = self._meta
+            if meta is not None and name in meta:
+                return meta[name]
+        raise AttributeError(
+            "'{}' object has no attribute '{}'".format(type(self).__name__, name)
+        )
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        if hasattr(type(self), name):
+            # Slots and properties
+            _set_slot(self, name, value)
+        elif self._meta is None:
+            _set_slot(self, "_meta", {name: value})
+        else:
+            self._meta[name] = value
+
+    def __delattr__(self, name: str) -> None:
+        if hasattr(type(self), name):
+            object.__delattr__(self, name)
+        elif self._meta is not None and name in self._meta:
+            del self._meta[name]
+        else:
+            raise AttributeError(name)
+
+    @property
+    def meta(self) -> typing.Dict[str, typing.Any]:
+        return dict(self._meta) if self._meta else {}
+
+
+class SubtitleLine(MetaSlots, UnicodeMixin):
     """
     Class representing a line inside SubtitleUnit. It acts as an ordinary
     unicode objects, but has an ability to store additional metadata.
     """
 
+    __slots__ = ("text",)
+
     def __init__(self, text: str, **kwargs):
-        self.text = text
-        # Update with additional metadata
-        self.__dict__.update(kwargs)
+        _set_slot(self, "text", text)
+        # Additional metadata
+        _set_slot(self, "_meta", kwargs or None)
 
     def export(self) -> typing.Union[str, typing.Dict[str, typing.Any]]:
         """Returns line in format for export."""
-        output = dict(self.__dict__)
-        text = output.pop("text", "")
-        if not output:
-            output = text
-        else:
-            output["text"] = text
+        if not self._meta:
+            return self.text
+        output = dict(self._meta)
+        output["text"] = self.text
         return output
 
     @classmethod
@@ -169,18 +218,11 @@ class SubtitleLine(UnicodeMixin):
     def __eq__(self, other: typing.Any) -> bool:
         if not isinstance(other, SubtitleLine):
             return False
-        return self.__dict__ == other.__dict__
+        return self.text == other.text and (self._meta or {}) == (other._meta or {})
 
     def __len__(self) -> int:
         return len(self.text)
 
-    @property
-    def meta(self) -> typing.Dict[str, typing.Any]:
-        d = dict(self.__dict__)
-        # Remove important part of metadata
-        d.pop("text")
-        return d
-
 
 class SubtitleLines(typing.List[SubtitleLine]):
     """Modified list class for special tratment of lines."""
@@ -213,9 +255,110 @@ class SubtitleLines(typing.List[SubtitleLine]):
         super(SubtitleLines, self).__setattr__(index, value)
 
 
-class SubtitleUnit:
+class LazySubtitleLines(SubtitleLines):
+    """
+    Lines that are kept as raw 'text' until first used, then 'split' turns it into
+    texts of lines. Parsers use it so timing only work does not build the lines.
+    """
+
+    __slots__ = ("_text", "_split")
+    _text: typing.Any
+    _split: typing.Optional[typing.Callable[[typing.Any], typing.List[str]]]
+
+    def __new__(
+        cls, text: typing.Any, split: typing.Callable[[typing.Any], typing.List[str]]
+    ) -> "LazySubtitleLines":
+        obj = list.__new__(cls)
+        obj._text = text
+        obj._split = split
+        return obj
+
+    def __init__(self, *args) -> None:
+        # Items are added when materialized
+        pass
+
+    @property
+    def materialized(self) -> bool:
+        return self._split is None
+
+    def _materialize(self) -> None:
+        if self._split is not None:
+            split, self._split = self._split, None
+            text, self._text = self._text, None
+            for line in split(text):
+                list.append(self, SubtitleLine(line))
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        if self._split is not None:
+            return (LazySubtitleLines, (self._text, self._split))
+        return (SubtitleLines, (), None, iter(self))
+
+    def __repr__(self) -> str:
+        self._materialize()
+        return super(LazySubtitleLines, self).__repr__()
+
+    def __radd__(self, other: typing.Any) -> typing.Any:
+        # Called before list + for a subclass, which would read the items directly
+        if not isinstance(other, list):
+            return NotImplemented
+        self._materialize()
+        return list.__add__(other, self)
+
+
+def _materializing(name: str) -> typing.Callable:
+    method = getattr(SubtitleLines, name)
+
+    def materializing(self, *args, **kwargs):
+        self._materialize()
+        # List methods read items of other lists directly
+        for arg in args:
+            if isinstance(arg, LazySubtitleLines):
+                arg._materialize()
+        return method(self, *args, **kwargs)
+
+    materializing.__name__ = name
+    return materializing
+
+
+for _name in (
+    "__iter__",
+    "__reversed__",
+    "__len__",
+    "__contains__",
+    "__getitem__",
+    "__setitem__",
+    "__delitem__",
+    "__eq__",
+    "__ne__",
+    "__lt__",
+    "__le__",
+    "__gt__",
+    "__ge__",
+    "__add__",
+    "__iadd__",
+    "__mul__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "index",
+    "count",
+    "copy",
+    "reverse",
+    "sort",
+):
+    setattr(LazySubtitleLines, _name, _materializing(_name))
+del _name
+
+
+class SubtitleUnit(MetaSlots):
     """Class for holding time and text data of a subtitle unit."""
 
+    __slots__ = ("start", "end", "_lines")
+
     def __init__(
         self,
         start: typing.Union[float, Frame],
@@ -223,12 +366,17 @@ class SubtitleUnit:
         lines: typing.Any = None,
         **meta,
     ):
-        self.start = float(start) if not isinstance(start, Frame) else start
-        self.end = float(end) if not isinstance(end, Frame) else end
-        self._lines = SubtitleLines()
-
-        self.__dict__.update(meta)
-
+        _set_slot(
+            self, "start", float(start) if not isinstance(start, Frame) else start
+        )
+        _set_slot(self, "end", float(end) if not isinstance(end, Frame) else end)
+        _set_slot(self, "_meta", meta or None)
+
+        if isinstance(lines, LazySubtitleLines):
+            # Stays lazy until used
+            _set_slot(self, "_lines", lines)
+            return
+        _set_slot(self, "_lines", SubtitleLines())
         if lines is not None:
             if not isinstance(lines, (list, set)):
                 lines = list(lines)
@@ -287,7 +435,7 @@ class SubtitleUnit:
 
     def get_moved(self, distance: typing.Union[int, float]) -> "SubtitleUnit":
         """Same as SubtitleUnit.move, just returns a copy while itself is unchanged."""
-        clone = SubtitleUnit(**self.__dict__)
+        clone = self._clone()
         clone.move(distance)
         return clone
 
@@ -303,18 +451,15 @@ class SubtitleUnit:
 
     def get_stretched(self, factor: typing.Union[int, float]) -> "SubtitleUnit":
         """Same as SubtitleUnit.stretch, just returns a copy while itself is unchanged."""
-        clone = SubtitleUnit(**self.__dict__)
+        clone = self._clone()
         clone.stretch(factor)
         return clone
 
-    @property
-    def meta(self) -> typing.Dict[str, typing.Any]:
-        d = dict(self.__dict__)
-        # Remove important part of metadata and lines
-        d.pop("start")
-        d.pop("end")
-        d.pop("_lines")
-        return d
+    def _clone(self) -> "SubtitleUnit":
+        clone = SubtitleUnit(self.start, self.end, **self.meta)
+        # Lines are shared with the original
+        _set_slot(clone, "_lines", self._lines)
+        return clone
 
     def __sub__(self, other) -> "SubtitleUnit":
         """See SubtitleUnit.get_moved."""
@@ -356,23 +501,24 @@ class SubtitleUnit:
                 )
             )
 
-        return self.__dict__ == other.__dict__
+        return (
+            self.start == other.start
+            and self.end == other.end
+            and self._lines == other._lines
+            and (self._meta or {}) == (other._meta or {})
+        )
 
     def __len__(self) -> int:
         return len(self._lines)
 
     def __repr__(self) -> str:
-        d = dict(self.__dict__)
-        # Get known attributes
-        start = d.pop("start")
-        end = d.pop("end")
-        lines = d.pop("_lines")
-        return "SubtitleUnit({}, {}, {}, {})".format(start, end, lines, d)
+        return "SubtitleUnit({}, {}, {}, {})".format(
+            self.start, self.end, self._lines, self.meta
+        )
 
     def to_dict(self, human_time=True) -> typing.Dict[str, typing.Any]:
         """Returns subtitle unit as a dict (with some human readable things)."""
         output = {}
-        output.update(self.__dict__)
         # Overide custom attributes
         output["start"] = (
             HumanTime.from_seconds(self.start)
@@ -384,11 +530,9 @@ class SubtitleUnit:
             if human_time and not isinstance(self.end, Frame)
             else self.end
         )
+        output.update(self.meta)
         # And lines
         output["lines"] = [i.export() for i in self._lines]
-
-        # Remove lines
-        output.pop("_lines")
         return output
 
     @classmethod
@@ -413,19 +557,332 @@ class SubtitleUnit:
         return cls(lines=SubtitleLines(lines), **input)
 
 
+class ColumnarUnit(SubtitleUnit):
+    """
+    SubtitleUnit that is a view of a row in UnitColumns. It follows its row when units
+    are inserted, removed or reordered. Once its row is removed or replaced, it keeps
+    a copy of the unit instead, like a unit removed from a list would.
+    """
+
+    __slots__ = ("_columns", "_index", "__weakref__")
+
+    @classmethod
+    def _row(cls, columns: "UnitColumns", index: int) -> "ColumnarUnit":
+        obj = cls.__new__(cls)
+        _set_slot(obj, "_columns", columns)
+        _set_slot(obj, "_index", index)
+        return obj
+
+    @property
+    def start(self) -> float:
+        return self._columns.starts[self._index]
+
+    @start.setter
+    def start(self, value: float) -> None:
+        self._columns.starts[self._index] = value
+
+    @property
+    def end(self) -> float:
+        return self._columns.ends[self._index]
+
+    @end.setter
+    def end(self, value: float) -> None:
+        self._columns.ends[self._index] = value
+
+    @property
+    def _lines(self) -> SubtitleLines:
+        return self._columns.lines[self._index]
+
+    @_lines.setter
+    def _lines(self, value: SubtitleLines) -> None:
+        self._columns.lines[self._index] = value
+
+    @property
+    def _meta(self) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        return self._columns.metas[self._index]
+
+    @_meta.setter
+    def _meta(self, value: typing.Optional[typing.Dict[str, typing.Any]]) -> None:
+        self._columns.metas[self._index] = value
+
+    def _detach(self) -> None:
+        """Moves data of the row into columns of its own."""
+        columns = UnitColumns()
+        columns._append(self._columns._get(self._index))
+        columns._keep_view(0, self)
+        _set_slot(self, "_columns", columns)
+        _set_slot(self, "_index", 0)
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        # Copies are plain units
+        return (_plain_unit, (self.start, self.end, self._lines, self._meta))
+
+
+def _plain_unit(
+    start: float,
+    end: float,
+    lines: SubtitleLines,
+    meta: typing.Optional[typing.Dict[str, typing.Any]],
+) -> SubtitleUnit:
+    unit = SubtitleUnit(start, end, **(meta or {}))
+    _set_slot(unit, "_lines", lines)
+    return unit
+
+
+class UnitColumns(typing.MutableSequence[SubtitleUnit]):
+    """
+    Storage of units in columns: times in seconds in arrays, lines and metadata in
+    lists. Units are copied in and ColumnarUnit views are made on access, one per row
+    for as long as it is in use.
+    """
+
+    def __init__(self) -> None:
+        self.starts = array.array("d")
+        self.ends = array.array("d")
+        self.lines: typing.List[SubtitleLines] = []
+        self.metas: typing.List[typing.Optional[typing.Dict[str, typing.Any]]] = []
+        # Weak references to views handed out, by their row
+        self._views: typing.Dict[int, "weakref.ref[ColumnarUnit]"] = {}
+
+    @staticmethod
+    def _row(unit: SubtitleUnit) -> typing.Tuple[typing.Any, ...]:
+        if not isinstance(unit, SubtitleUnit):
+            raise TypeError(
+                "Can add only SubtitleUnit, you passed '{}'".format(type(unit))
+            )
+        if isinstance(unit.start, Frame) or isinstance(unit.end, Frame):
+            raise TypeError("Columnar storage needs times in seconds, not frames.")
+        return unit.start, unit.end, unit._lines, unit._meta
+
+    def _get(self, index: int) -> typing.Tuple[typing.Any, ...]:
+        return (
+            self.starts[index],
+            self.ends[index],
+            self.lines[index],
+            self.metas[index],
+        )
+
+    def _append(self, row: typing.Tuple[typing.Any, ...]) -> None:
+        start, end, lines, meta = row
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(lines)
+        self.metas.append(meta)
+
+    def _view(self, index: int) -> "ColumnarUnit":
+        ref = self._views.get(index)
+        view = ref() if ref is not None else None
+        if view is None:
+            view = ColumnarUnit._row(self, index)
+            self._keep_view(index, view)
+        return view
+
+    def _keep_view(self, index: int, view: "ColumnarUnit") -> None:
+        self._views[index] = weakref.ref(view, functools.partial(self._forget, index))
+
+    def _forget(self, index: int, ref: "weakref.ref[ColumnarUnit]") -> None:
+        # View is gone, unless there is another one on its row by now
+        if self._views.get(index) is ref:
+            del self._views[index]
+
+    def _move_views(self, row: typing.Callable[[int], typing.Optional[int]]) -> None:
+        """
+        Moves views to rows 'row' gives for their current ones, views it gives None
+        for are detached. Has to be called before the rows are changed.
+        """
+        views = [(i, ref()) for i, ref in self._views.items()]
+        self._views = {}
+        for index, view in views:
+            if view is None:
+                continue
+            new = row(index)
+            if new is None:
+                view._detach()
+            else:
+                _set_slot(view, "_index", new)
+                self._keep_view(new, view)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: typing.Any) -> typing.Any:
+        if isinstance(index, slice):
+            return [self._view(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Unit index out of range.")
+        return self._view(index)
+
+    def __setitem__(self, index: typing.Any, unit: typing.Any) -> None:
+        if isinstance(index, slice):
+            # Whole rows are read before any is written, they may be views of them
+            rows = [self._row(i) for i in unit]
+            replaced = range(*index.indices(len(self)))
+            if index.step not in (None, 1) and len(rows) != len(replaced):
+                raise ValueError(
+                    "Attempt to assign sequence of size {} to extended slice of size "
+                    "{}.".format(len(rows), len(replaced))
+                )
+            end = replaced.start + len(replaced)
+            shift = len(rows) - len(replaced)
+            self._move_views(
+                lambda i: None if i in replaced else i + shift if i >= end else i
+            )
+            self.starts[index] = array.array("d", [i[0] for i in rows])
+            self.ends[index] = array.array("d", [i[1] for i in rows])
+            self.lines[index] = [i[2] for i in rows]
+            self.metas[index] = [i[3] for i in rows]
+            return
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Unit index out of range.")
+        if unit is self._views.get(index, lambda: None)():
+            # Already there
+            return
+        row = self._row(unit)
+        self._move_views(lambda i: None if i == index else i)
+        (
+            self.starts[index],
+            self.ends[index],
+            self.lines[index],
+            self.metas[index],
+        ) = row
+
+    def __delitem__(self, index: typing.Any) -> None:
+        if isinstance(index, slice):
+            removed = sorted(range(*index.indices(len(self))))
+        else:
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("Unit index out of range.")
+            removed = [index]
+
+        def row(i: int) -> typing.Optional[int]:
+            before = bisect.bisect_left(removed, i)
+            if before < len(removed) and removed[before] == i:
+                return None
+            return i - before
+
+        self._move_views(row)
+        del self.starts[index]
+        del self.ends[index]
+        del self.lines[index]
+        del self.metas[index]
+
+    def insert(self, index: int, unit: SubtitleUnit) -> None:
+        start, end, lines, meta = self._row(unit)
+        # Same as list.insert
+        if index < 0:
+            index = max(index + len(self), 0)
+        index = min(index, len(self))
+        self._move_views(lambda i: i + 1 if i >= index else i)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.lines.insert(index, lines)
+        self.metas.insert(index, meta)
+
+    def append(self, unit: SubtitleUnit) -> None:
+        self._append(self._row(unit))
+
+    def sort(self, key: typing.Optional[typing.Callable] = None) -> None:
+        """Sorts units by 'key' of them, by start by default."""
+        if key is None:
+            order = sorted(range(len(self)), key=self.starts.__getitem__)
+        else:
+            order = sorted(range(len(self)), key=lambda i: key(self[i]))
+        rows = {row: i for i, row in enumerate(order)}
+        self._move_views(rows.__getitem__)
+        self.starts = array.array("d", map(self.starts.__getitem__, order))
+        self.ends = array.array("d", map(self.ends.__getitem__, order))
+        self.lines = list(map(self.lines.__getitem__, order))
+        self.metas = list(map(self.metas.__getitem__, order))
+
+    def move(self, distance: float) -> None:
+        """Moves all units by 'distance' seconds."""
+        distance = float(distance)
+        self.starts = array.array("d", map(distance.__add__, self.starts))
+        self.ends = array.array("d", map(distance.__add__, self.ends))
+
+    def stretch(self, factor: float) -> None:
+        """Stretches all units for 'factor'."""
+        factor = float(factor)
+        self.starts = array.array("d", map(factor.__mul__, self.starts))
+        self.ends = array.array("d", map(factor.__mul__, self.ends))
+
+    def __eq__(self, other: typing.Any) -> bool:
+        if isinstance(other, UnitColumns):
+            return (
+                self.starts == other.starts
+                and self.ends == other.ends
+                and self.lines == other.lines
+                and [i or {} for i in self.metas] == [i or {} for i in other.metas]
+            )
+        if isinstance(other, list):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __getstate__(self) -> typing.Dict[str, typing.Any]:
+        # Views stay with this copy
+        state = dict(self.__dict__)
+        del state["_views"]
+        return state
+
+    def __setstate__(self, state: typing.Dict[str, typing.Any]) -> None:
+        self.__dict__.update(state)
+        self._views = {}
+
+
 class Subtitle:
     """
     The whole subtitle.
 
-    To load a subtitle in non-native format, use parsers.Parser.from_data.
+    To load a subtitle in non-native format, use parsers.Parser.from_data. If
+    'columnar', units are stored in UnitColumns, see Subtitle.columnar.
     """
 
-    def __init__(self, units: typing.Iterable[SubtitleUnit] = [], **meta):
-        self._units: typing.List[SubtitleUnit] = []
+    def __init__(
+        self,
+        units: typing.Iterable[SubtitleUnit] = [],
+        columnar: bool = False,
+        **meta,
+    ):
+        self._units: typing.Union[typing.List[SubtitleUnit], UnitColumns] = (
+            UnitColumns() if columnar else []
+        )
         self.__dict__.update(meta)
         for unit in units:
             self.append(unit)
 
+    @property
+    def columnar(self) -> bool:
+        """
+        Whether units are stored in columns. Columnar subtitle copies units in and
+        gives views of them on access, its whole subtitle operations (order, move,
+        stretch and check_overlaps) go over arrays of times instead of units. Times
+        have to be in seconds.
+        """
+        return isinstance(self._units, UnitColumns)
+
+    def move(self, distance: typing.Union[int, float]) -> None:
+        """Moves all units by 'distance' seconds."""
+        if isinstance(self._units, UnitColumns):
+            self._units.move(distance)
+        else:
+            for unit in self._units:
+                unit.move(distance)
+
+    def stretch(self, factor: typing.Union[int, float]) -> None:
+        """Stretches all units for 'factor'."""
+        if isinstance(self._units, UnitColumns):
+            self._units.stretch(factor)
+        else:
+            for unit in self._units:
+                unit.stretch(factor)
+
     def add_unit(self, unit: SubtitleUnit):
         """Adds a new 'unit' and sorts the units. If adding many units, use append instead."""
         self.append(unit)
@@ -433,11 +890,24 @@ class Subtitle:
 
     def order(self) -> None:
         """Maintains order of subtitles."""
-        self._units.sort(key=lambda x: x.start)
+        if isinstance(self._units, UnitColumns):
+            # By start, without views
+            self._units.sort()
+        else:
+            self._units.sort(key=lambda x: x.start)
 
     def check_overlaps(self) -> typing.List[typing.Tuple[int, int]]:
         """Checks for overlaps and returns them in list."""
         overlaps: typing.List[typing.Tuple[int, int]] = []
+        if isinstance(self._units, UnitColumns):
+            starts, ends = self._units.starts, self._units.ends
+            for i, end in enumerate(ends[:-1]):
+                j = i + 1
+                while j < len(starts) and end > starts[j]:
+                    overlaps.append((i, j))
+                    j += 1
+            return overlaps
+
         for current_unit in self._units[:-1]:
             i = self._units.index(current_unit)
             for next_unit in self._units[i + 1 :]:
@@ -448,6 +918,28 @@ class Subtitle:
 
         return overlaps
 
+    def frames_to_seconds(self, fps: typing.Optional[float] = None) -> None:
+        """
+        Converts Frame timings of all units to seconds at 'fps', by default at the fps
+        of the subtitle. Frames are converted in one batch.
+        """
+        if fps is None:
+            fps = getattr(self, "fps", None)
+        if not fps:
+            raise ValueError("Cannot convert frames to time without specified FPS.")
+
+        timings = [
+            (unit, name)
+            for unit in self._units
+            for name in ("start", "end")
+            if isinstance(getattr(unit, name), Frame)
+        ]
+        times = frames_to_seconds(
+            (getattr(unit, name)._frame for unit, name in timings), fps
+        )
+        for (unit, name), time in zip(timings, times):
+            setattr(unit, name, time)
+
     def remove(self, unit: SubtitleUnit) -> None:
         """Proxy for internal storage."""
         if not isinstance(unit, SubtitleUnit):
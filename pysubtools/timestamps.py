@@ -0,0 +1,58 @@
+import array
+import typing
+
+
+def parse_time(text: str) -> int:
+    """
+    Returns milliseconds of timestamp 'text' in "HH:MM:SS,mmm" format. Decimal point
+    may be a dot and the fraction may be shorter or missing, digits past milliseconds
+    are dropped.
+    """
+    hours, minutes, seconds = text.split(":")
+    seconds, _, fraction = seconds.replace(",", ".").partition(".")
+    milliseconds = int((fraction + "000")[:3])
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + milliseconds
+
+
+def format_time(milliseconds: int, separator: str = ",") -> str:
+    """Returns "HH:MM:SS,mmm" for 'milliseconds', with 'separator' before fraction."""
+    seconds, milliseconds = divmod(int(milliseconds), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return "{:02d}:{:02d}:{:02d}{}{:03d}".format(
+        hours, minutes, seconds, separator, milliseconds
+    )
+
+
+def to_milliseconds(seconds: float) -> int:
+    """Returns 'seconds' rounded to milliseconds."""
+    return round(seconds * 1000)
+
+
+def to_seconds(milliseconds: int) -> float:
+    """Returns 'milliseconds' in seconds, the closest float to it."""
+    return milliseconds / 1000
+
+
+def parse_times(texts: typing.Iterable[str]) -> "array.array[int]":
+    """Returns an array of milliseconds of all timestamps in 'texts'."""
+    return array.array("q", map(parse_time, texts))
+
+
+def format_times(
+    milliseconds: typing.Iterable[int], separator: str = ","
+) -> typing.List[str]:
+    """Returns timestamps for all 'milliseconds'."""
+    return [format_time(i, separator) for i in milliseconds]
+
+
+def frames_to_seconds(frames: typing.Iterable[int], fps: float) -> "array.array[float]":
+    """Returns an array of times in seconds of all 'frames' at 'fps'."""
+    return array.array("d", (frame / fps for frame in frames))
+
+
+def seconds_to_frames(
+    seconds: typing.Iterable[float], fps: float
+) -> "array.array[int]":
+    """Returns an array of frames of all times in 'seconds' at 'fps', rounded."""
+    return array.array("q", (round(time * fps) for time in seconds))
@@ -15,5 +15,7 @@ class UnicodeMixin(object):
     """Mixin class to handle defining the proper __str__/__unicode__
     methods in Python 2 or 3."""
 
+    __slots__ = ()
+
     def __str__(self):
         return self.__unicode__()
@@ -1,12 +1,26 @@
+import asyncio
 import unittest
 import os
 import tempfile
+import shutil
 import io
+import pickle
 import yaml
 
-from pysubtools import Subtitle, SubtitleUnit
-from pysubtools.parsers import Parser, encodings
+from pysubtools import Subtitle, SubtitleLine, SubtitleUnit
+from pysubtools.subtitle import Frame
+from pysubtools.parsers import (
+    Parser,
+    DetectionCache,
+    EncodingPriors,
+    ParseStats,
+    NoParserError,
+    ParseError,
+    encodings,
+)
+from pysubtools.parsers.subrip import SubRipParser
 from pysubtools.exporters import Exporter
+from pysubtools import timestamps
 from pysubtools.utils import PatchedGzipFile as GzipFile
 
 
@@ -299,6 +313,57 @@ Yes, I  said two liner! \x9e\r
 """
         )
 
+    def test_export_microdvd(self):
+        """Tests exporting to MicroDVD."""
+        with open("./tests/data/microdvd/2.sub", "rb") as f:
+            sub = Parser.from_data(f, stop_level=None).parse()
+        buf = io.BytesIO()
+        Exporter.from_format("MicroDVD").export(buf, sub)
+        output = buf.getvalue().splitlines()
+        # Global styles once, frames as they are
+        assert output[0] == b"{DEFAULT}{F:DeJaVuSans}{S:10}{C:$FF0000}"
+        assert output[-1] == b"{46}{47}{y:b,u}{f:DeJaVuSans}{s:12}{c:$0000ff}Hello!"
+        parsed = Parser.from_format("MicroDVD", stop_level=None).parse(buf.getvalue())
+        assert parsed == sub
+
+        # Seconds are converted to frames
+        subtitle = Subtitle()
+        subtitle.append(SubtitleUnit(start=1, end=2.5, lines=["First", "Second"]))
+        self.assertRaises(
+            ValueError, Exporter.from_format("MicroDVD").export, io.BytesIO(), subtitle
+        )
+        buf = io.BytesIO()
+        Exporter.from_format("MicroDVD", fps=25).export(buf, subtitle)
+        assert buf.getvalue() == b"{1}{1}25\r\n{25}{62}First|Second\r\n"
+        parsed = Parser.from_format("MicroDVD").parse(buf.getvalue())
+        assert parsed.fps == 25
+        assert [(i.start, i.end) for i in parsed] == [(1.0, 2.48)]
+
+    def test_timestamps(self):
+        """Tests integer millisecond timestamps."""
+        assert timestamps.parse_time("01:02:03,004") == 3723004
+        assert timestamps.parse_time("1:2:3.4") == 3723400
+        assert timestamps.format_time(3723004) == "01:02:03,004"
+        assert timestamps.format_time(3723004, ".") == "01:02:03.004"
+
+        values = range(0, 100 * 3600 * 1000, 9973)
+        texts = timestamps.format_times(values)
+        assert list(timestamps.parse_times(texts)) == list(values)
+        for value in values:
+            seconds = timestamps.to_seconds(value)
+            assert timestamps.to_milliseconds(seconds) == value
+
+        # Floats do not truncate milliseconds on export
+        assert Exporter.from_format("SubRip")._convert_time(1.001) == "00:00:01,001"
+
+        # Parse and export give back the same timings
+        with open("./tests/data/srt/1.srt", "rb") as f:
+            sub = Parser.from_data(f).parse()
+        buf = io.BytesIO()
+        Exporter.from_format("SubRip").export(buf, sub)
+        parsed = Parser.from_format("SubRip").parse(buf.getvalue())
+        assert [(i.start, i.end) for i in parsed] == [(i.start, i.end) for i in sub]
+
     def test_subtitle_lines(self):
         """Tests API of the subtitle lines."""
         sub = Subtitle()
@@ -327,6 +392,80 @@ Yes, I  said two liner! \x9e\r
         assert sub[0][0].styles == {"color": "red"}
         assert sub[0][1].styles == {"color": "blue"}
 
+    def test_compact_units(self):
+        """Tests that units and lines keep metadata only in a side dict."""
+        line = SubtitleLine("Hello", styles={"*": {"color": "#FF0000"}})
+        unit = SubtitleUnit(1, 2, ["First", line], position={"x": 1, "y": 2})
+        assert not hasattr(unit, "__dict__") and not hasattr(line, "__dict__")
+        assert SubtitleUnit(1, 2, ["First"])._meta is None
+        assert SubtitleLine("First")._meta is None
+
+        assert unit.meta == {"position": {"x": 1, "y": 2}}
+        assert line.meta == {"styles": {"*": {"color": "#FF0000"}}}
+        assert line.export() == {"styles": {"*": {"color": "#FF0000"}}, "text": "Hello"}
+        assert unit[0].export() == "First"
+        assert list(unit.to_dict(human_time=False).items()) == [
+            ("start", 1.0),
+            ("end", 2.0),
+            ("position", {"x": 1, "y": 2}),
+            ("lines", ["First", line.export()]),
+        ]
+
+        clone = pickle.loads(pickle.dumps(unit))
+        assert clone == unit
+        clone.comment = "Moved"
+        assert clone != unit
+        del clone.comment
+        assert clone == unit
+        self.assertRaises(AttributeError, getattr, clone, "comment")
+        assert SubtitleUnit.from_dict(unit.to_dict()) == unit
+
+    def test_columnar(self):
+        """Tests subtitle with units stored in columns."""
+        with open("./tests/data/srt/1.srt", "rb") as f:
+            sub = Parser.from_data(f).parse()
+        columnar = Subtitle(sub, columnar=True, **sub.meta)
+        assert columnar.columnar and not sub.columnar
+        assert columnar == sub
+        assert list(columnar) == list(sub)
+        assert columnar[-1] == sub[-1]
+        assert columnar.check_overlaps() == sub.check_overlaps()
+        assert columnar.dump() == sub.dump()
+
+        # Views write to columns
+        columnar[0].move(1)
+        columnar[0].comment = "Moved"
+        assert columnar[0].start == sub[0].start + 1
+        assert columnar[0].comment == "Moved"
+        assert pickle.loads(pickle.dumps(columnar[0])) == columnar[0]
+        columnar[0] = sub[0]
+        assert columnar == sub
+
+        # Views follow their units and keep them once they are replaced
+        for s in (sub, columnar):
+            s[0], s[1] = s[1], s[0]
+            held, replaced = s[1], s[3]
+            s.insert(0, SubtitleUnit(0, 1, ["First"]))
+            del s[1]
+            s[3] = SubtitleUnit(1, 2, ["Replaced"])
+            held.move(10)
+            replaced.move(10)
+        assert columnar == sub
+        assert columnar[1] is columnar[1]
+        assert list(columnar[3].lines) == ["Replaced"]
+
+        # Whole subtitle operations
+        for s in (sub, columnar):
+            s.move(2)
+            s.stretch(0.5)
+            s.insert(0, SubtitleUnit(3600, 3601, ["Last"]))
+            s.order()
+            del s[1]
+        assert columnar == sub
+        assert list(columnar[-1].lines) == ["Last"]
+
+        self.assertRaises(TypeError, columnar.append, SubtitleUnit(Frame(1), Frame(2)))
+
     def test_lookup(self):
         """Some encoding python cannot read, we need to make sure it won't make a low-level error."""
         with open("./tests/data/corner/lookup_error.srt", "rb") as f:
@@ -350,3 +489,618 @@ Yes, I  said two liner! \x9e\r
 
             # Will it parse?
             parser.parse(f)
+
+    def test_capped_messages(self):
+        """Tests that only a limited number of messages is kept, but all are counted."""
+        data = b"Junk\n" * 1000 + b"1\n00:00:01,000 --> 00:00:02,000\nText\n\n"
+        parser = Parser.from_format("SubRip", stop_level=None)
+        sub = parser.parse(data)
+        capped = Parser.from_format("SubRip", stop_level=None, max_messages=10)
+        assert capped.parse(data) == sub
+
+        diagnostics = capped.diagnostics["warning"]
+        assert capped.warnings == parser.warnings[:10]
+        assert diagnostics.counts == {"Junk before first unit.": 1000}
+        assert diagnostics.dropped == 990
+        # Same line text is stored once
+        assert parser.diagnostics["warning"]._texts == ["Junk"]
+
+    def test_quiet_parser(self):
+        """Tests that quiet parser gives the same units without any messages."""
+        for root, suffix, format in (
+            ("./tests/data/srt", ".srt", "SubRip"),
+            ("./tests/data/microdvd", ".sub", "MicroDVD"),
+        ):
+            for filename in (i for i in os.listdir(root) if i.endswith(suffix)):
+                with open(os.path.join(root, filename), "rb") as f:
+                    data = f.read()
+                parser = Parser.from_format(format, stop_level=None)
+                quiet = Parser.from_format(format, stop_level=None, quiet=True)
+                assert quiet.parse(data) == parser.parse(data), filename
+                assert quiet.warnings == quiet.errors == []
+
+        # Errors still stop it
+        quiet = Parser.from_format("SubRip", quiet=True)
+        self.assertRaises(ParseError, quiet.parse, b"1\n00:00:01,000 --> xx\n")
+
+    def test_sampled_encoding(self):
+        """Tests encoding detection on samples of a large subtitle."""
+        with open("./tests/data/srt/8.srt", "rb") as f:
+            data = f.read() * 10
+
+        detected = encodings.detect(io.BytesIO(data), sample_size=24576)
+        encoding, confidence = detected
+        assert encoding == "windows-1250"
+        assert detected.reason == "samples"
+        assert confidence == detected.sample_confidence
+        assert encodings.sample_confidence <= confidence <= 1
+
+        # Middle sample looks like utf-8, but the whole file is not
+        with open("./tests/data/corner/lookup_error.srt", "rb") as f:
+            encoding, _ = encodings.detect(f, sample_size=24576)
+            assert encoding == "windows-1250"
+
+    def test_encoding_validation(self):
+        """Tests single pass validation of candidate encodings."""
+        data = io.BytesIO("\u017e\u010d\u0161".encode("windows-1250") * 10000)
+
+        # First surviving encoding in given order wins
+        assert (
+            encodings.validate(data, ["ascii", "utf-8", "bullshit", "windows-1250"])
+            == "windows-1250"
+        )
+        assert data.tell() == 0
+        # Invalid chars reject an otherwise decodable encoding
+        assert encodings.validate(data, ["latin-1"]) is None
+        # Similar encodings follow the one they are similar to
+        assert encodings.with_similar(
+            [("ISO-8859-2", None), ("utf-8", 0.5), ("windows-1250", None)]
+        ) == [("ISO-8859-2", None), ("windows-1250", None), ("utf-8", 0.5)]
+
+    def test_encoding_cache(self):
+        """Tests persistent cache of encoding detection results."""
+        tmpfd, tmp = tempfile.mkstemp()
+        os.close(tmpfd)
+        cache = DetectionCache(tmp, max_entries=2)
+
+        with open("./tests/data/srt/12.srt", "rb") as f:
+            parser = Parser.from_format("SubRip", stop_level=None)
+            parser.parse(f, cache=cache)
+            assert len(cache) == 1
+
+            # A hit, even if detection would do differently now
+            key = cache.key(f, None, None, None)
+            cache.set(key, "windows-1250", 0.5)
+            f.seek(0)
+            parser.parse(f, cache=cache)
+            assert parser.encoding == "windows-1250"
+            assert parser.encoding_confidence == 0.5
+
+            # Hints are part of the key
+            parser.parse(f, language="sl", cache=cache)
+            assert len(cache) == 2
+            assert cache.get(key) is not None
+
+        # Least recently used are evicted
+        encodings.detect(io.BytesIO(b"Some text"), cache=cache)
+        assert len(cache) == 2
+        assert cache.get(key) is not None
+
+        cache.close()
+        os.unlink(tmp)
+
+    def test_unicode_encoding(self):
+        """Tests ASCII and UTF-8 detection ahead of charset_normalizer."""
+        with open("./tests/data/corner/high_mem.srt", "rb") as f:
+            parser = Parser.from_data(f)
+            assert parser.encoding == "ascii"
+            assert parser.encoding_reason == "ascii"
+
+        detected = encodings.detect(io.BytesIO("\u0161ala".encode("utf-8")))
+        assert detected == ("utf-8", 1.0)
+        assert detected.reason == "utf-8"
+
+        # Hints still come first
+        detected = encodings.detect(io.BytesIO(b"Text"), encoding="windows-1250")
+        assert detected == ("windows-1250", None)
+        assert detected.reason == "hint"
+
+        # Invalid chars are not accepted as UTF-8
+        detected = encodings.detect(io.BytesIO("\x9e\u0161".encode("utf-8")))
+        assert detected.reason == "detected"
+
+    def test_encoding_priors(self):
+        """Tests encoding priors built from a labelled corpus."""
+        corpus = tempfile.mkdtemp()
+        text = "\u017e\u010d\u0161 \u0107"
+        for encoding, count in (("windows-1250", 1), ("utf-8", 2), ("bullshit", 5)):
+            os.makedirs(os.path.join(corpus, "sl", encoding))
+            for i in range(count):
+                path = os.path.join(corpus, "sl", encoding, "{}.srt".format(i))
+                with open(path, "wb") as f:
+                    f.write(
+                        text.encode(encoding if encoding != "bullshit" else "utf-8")
+                    )
+        # Mislabelled file
+        with open(os.path.join(corpus, "sl", "utf-8", "wrong.srt"), "wb") as f:
+            f.write(text.encode("windows-1250"))
+
+        priors = EncodingPriors.build(corpus)
+        priors.save(os.path.join(corpus, "priors.json"))
+        priors = EncodingPriors.load(os.path.join(corpus, "priors.json"))
+        shutil.rmtree(corpus)
+
+        assert priors.counts == {"sl": {"utf-8": 2, "cp1250": 1}}
+        assert encodings.guess_from_lang("sl", priors) == ["utf-8", "cp1250"]
+        # Unknown languages fall back to the built-in table
+        assert encodings.guess_from_lang("pl", priors) == ["windows-1250"]
+
+        detected = encodings.detect(
+            io.BytesIO(text.encode("windows-1250")), language="sl", priors=priors
+        )
+        assert detected == ("cp1250", None)
+        assert detected.reason == "language"
+
+    def test_iter_units(self):
+        """Tests streaming of parsed units."""
+        for path, format in (
+            ("./tests/data/srt/1.srt", "SubRip"),
+            ("./tests/data/microdvd/2.sub", "MicroDVD"),
+        ):
+            with open(path, "rb") as f:
+                sub = Parser.from_format(format, stop_level=None).parse(f)
+                f.seek(0)
+                parser = Parser.from_format(format, stop_level=None)
+                units = parser.iter_units(f)
+
+                # Nothing is parsed before asking
+                assert parser.warnings == []
+                first = next(units)
+                assert first == sub[0]
+                assert Subtitle([first] + list(units), **parser.metadata) == sub
+
+    def test_feed(self):
+        """Tests parsing of data pushed in chunks."""
+        with open("./tests/data/srt/8.srt", "rb") as f:
+            data = f.read()
+        sub = Parser.from_format("SubRip").parse(data)
+
+        parser = Parser.from_format("SubRip")
+        half = len(data) // 2
+        units = parser.feed(data[:half], detect_size=4096)
+        # Units come before the end of data
+        assert 0 < len(units) < len(sub)
+        for i in range(half, len(data), 100):
+            units += parser.feed(data[i : i + 100])
+        units += parser.close()
+        assert Subtitle(units) == sub
+        assert parser.close() == []
+
+        # Detected from whole lines when its end cuts a multibyte character
+        data = data.decode("windows-1250").encode("utf-8")
+        cut = data.index("č".encode("utf-8"), 4096) + 1
+        parser = Parser.from_format("SubRip")
+        units = parser.feed(data[:cut], detect_size=cut)
+        for i in range(cut, len(data), 7):
+            units += parser.feed(data[i : i + 7])
+        units += parser.close()
+        assert parser.encoding == "utf-8"
+        assert Subtitle(units) == sub
+
+        # Is not utf-8 after all, invalid bytes are replaced
+        end = data.rindex(b"\r\n\r\n")
+        data = data[:end] + "č!".encode("windows-1250") + data[end:]
+        parser = Parser.from_format("SubRip")
+        units = parser.feed(data[:cut], detect_size=cut)
+        for i in range(cut, len(data), 7):
+            units += parser.feed(data[i : i + 7])
+        units += parser.close()
+        assert Subtitle(units[:-1]) == Subtitle(list(sub)[:-1])
+        assert list(units[-1].lines)[-1].endswith("\ufffd!")
+        warning = parser.warnings[-1]
+        assert warning["line_number"] == len(data[:end].splitlines())
+        assert warning["line"].endswith("\ufffd!")
+
+        # MicroDVD global headers come between units
+        with open("./tests/data/microdvd/2.sub", "rb") as f:
+            data = f.read()
+        sub = Parser.from_format("MicroDVD", stop_level=None).parse(data)
+        assert sub.meta
+        parser = Parser.from_format("MicroDVD", stop_level=None)
+        units = parser.feed(data[:200], encoding="ascii", detect_size=64)
+        assert 0 < len(units) < len(sub)
+        for i in range(200, len(data), 50):
+            units += parser.feed(data[i : i + 50])
+        units += parser.close()
+        assert Subtitle(units, **parser.metadata) == sub
+
+    def test_parse_parallel(self):
+        """Tests parsing of a large SubRip in chunks in a process pool."""
+        with open("./tests/data/srt/1.srt", "rb") as f:
+            single = f.read()
+        with open("./tests/data/srt/8.srt", "rb") as f:
+            data = f.read()
+        # Numbering restarts in concatenated files
+        for data in (data, single + b"\r\n" + single + single):
+            parser = Parser.from_format("SubRip", stop_level=None)
+            sub = parser.parse(data)
+            parallel = Parser.from_format("SubRip", stop_level=None)
+            assert parallel.parse_parallel(data, workers=2, chunk_size=500) == sub
+            assert parallel.warnings == parser.warnings
+            assert parallel.errors == parser.errors
+
+        # Chunk may end inside a unit, errors quote replaced sequence numbers
+        cues = [
+            b"%d\n00:00:01,000 --> 00:00:02,000\nText\n\n" % i for i in range(1, 41)
+        ]
+        for broken in range(2, 12):
+            lines = cues.copy()
+            lines[broken] = b"3\n7\n1 --> 2\n\n"
+            lines[broken + 10] = b"%d\n00:00:01,000 --> 00:00:02\n\n" % broken
+            text = b"".join(lines)
+            parser = Parser.from_format("SubRip", stop_level=None)
+            sub = parser.parse(text, encoding="ascii")
+            parallel = Parser.from_format("SubRip", stop_level=None)
+            parsed = parallel.parse_parallel(
+                text, encoding="ascii", workers=2, chunk_size=20
+            )
+            assert parsed == sub
+            assert parallel.warnings == parser.warnings
+            assert parallel.errors == parser.errors
+
+        # Missing empty line is warned after the sequence number of the serial parse
+        text = b"".join(cues[:4]) + cues[4].replace(b"5", b"50", 1) + b"6\n"
+        for engine in SubRipParser.ENGINES:
+            parser = Parser.from_format("SubRip", stop_level=None, engine=engine)
+            sub = parser.parse(text, encoding="ascii")
+            parallel = Parser.from_format("SubRip", stop_level=None, engine=engine)
+            parsed = parallel.parse_parallel(
+                text, encoding="ascii", workers=2, chunk_size=3
+            )
+            assert parsed == sub
+            assert parallel.warnings == parser.warnings
+            assert parser.warnings[-1]["col"] == 1
+
+        # Stops on the same warning
+        parser = Parser.from_format("SubRip", stop_level="warning")
+        with self.assertRaises(ParseError) as e:
+            parser.parse_parallel(data, workers=2, chunk_size=500)
+        assert e.exception.line_number == len(single.splitlines()) + 2
+
+    def test_regex_engine(self):
+        """Tests that regex SubRip engine gives the same results as state machine."""
+        root = "./tests/data/srt"
+        with open(os.path.join(root, "1.srt"), "rb") as f:
+            single = f.read()
+        inputs = [single + b"\r\n" + single + single]
+        for filename in sorted(i for i in os.listdir(root) if i.endswith(".srt")):
+            with open(os.path.join(root, filename), "rb") as f:
+                inputs.append(f.read())
+        # Units without a sequence number after well formed cues, with headers that
+        # need fixing, and text continuing after a blank line
+        cue = b"1\n00:00:00,500 --> 00:00:01,000\nfirst\n\n"
+        inputs += [
+            cue + b"00:00:01.000 --> 00:00:02,000\nsecond\n\n",
+            cue + b"00:00:01,000 --> 00:00:02,000 junk\nsecond\n\n3\n",
+            cue + b"00:00:01.000 --> 00:00:02,000 junk\nsecond\n",
+            cue + b"more\n\n2\n00:00:01,000 --> 00:00:02,000\nsecond\n\n",
+            cue + b"00:00:xx --> 00:00:02,000\n\n2\n00:00:01,000 --> 00:00:02,000\nx\n",
+            # Unit with unparsable timings is reported on the sequence of the next one
+            cue + b"00:00:01,000 --> 00:00:02\n2\n00:00:01,000 --> 00:00:02,000\nx\n\n",
+        ]
+
+        for data in inputs:
+            results = []
+            for engine in SubRipParser.ENGINES:
+                parser = Parser.from_format("SubRip", stop_level=None, engine=engine)
+                results.append((parser.parse(data), parser.warnings, parser.errors))
+            assert results[0] == results[1]
+
+        # Same with pushed data
+        expected = Parser.from_format("SubRip", stop_level=None)
+        sub = expected.parse(inputs[0])
+        parser = Parser.from_format("SubRip", stop_level=None, engine="regex")
+        units = []
+        for i in range(0, len(inputs[0]), 50):
+            units += parser.feed(inputs[0][i : i + 50], encoding=expected.encoding)
+        units += parser.close()
+        assert Subtitle(units) == sub
+        assert parser.warnings == expected.warnings
+
+        # Stops on the same warning
+        for engine in SubRipParser.ENGINES:
+            parser = Parser.from_format("SubRip", stop_level="warning", engine=engine)
+            with self.assertRaises(ParseError) as e:
+                parser.parse(inputs[0])
+            assert e.exception.line_number == len(single.splitlines()) + 2
+
+        self.assertRaises(ValueError, Parser.from_format, "SubRip", engine="unknown")
+
+    def test_lazy_lines(self):
+        """Tests that lazily parsed units build their lines only when used."""
+        with open("./tests/data/srt/8.srt", "rb") as f:
+            data = f.read()
+        expected = Parser.from_format("SubRip", stop_level=None).parse(data)
+
+        for engine in SubRipParser.ENGINES:
+            parser = Parser.from_format(
+                "SubRip", stop_level=None, engine=engine, lazy=True
+            )
+            sub = parser.parse(data)
+            assert not any(unit._lines.materialized for unit in sub)
+            assert [i.duration for i in sub] == [i.duration for i in expected]
+            assert not any(unit._lines.materialized for unit in sub)
+
+            # Stays lazy when pickled
+            clone = pickle.loads(pickle.dumps(sub[0]))
+            assert not clone._lines.materialized
+            assert list(clone.lines) == list(expected[0].lines)
+            assert clone == expected[0]
+
+            assert list(sub[1]) == list(expected[1])
+            assert sub[1]._lines.materialized
+            assert sub == expected
+
+            # Lines of other lazy lines are built as well
+            a, b = parser.parse(data), parser.parse(data)
+            assert a[0] == b[0]
+            a, b = parser.parse(data), parser.parse(data)
+            assert list(expected[0]._lines) + a[0]._lines == expected[0]._lines * 2
+            assert b[0]._lines + a[0]._lines == expected[0]._lines * 2
+            lines = list(expected[0]._lines)
+            lines += b[0]._lines
+            assert lines == expected[0]._lines * 2
+            a, b = parser.parse(data), parser.parse(data)
+            b[0]._lines.extend(a[0]._lines)
+            assert b[0]._lines == expected[0]._lines * 2
+
+    def test_fps(self):
+        """Tests MicroDVD frame rate detection and conversion of frames to time."""
+        with open("./tests/data/microdvd/1.sub", "rb") as f:
+            data = f.read()
+        frames = Parser.from_format("MicroDVD", stop_level=None).parse(data)
+        self.assertRaises(ValueError, frames.frames_to_seconds)
+
+        parser = Parser.from_format("MicroDVD", stop_level=None)
+        sub = parser.parse(b"{1}{1}23.976\r\n" + data)
+        assert sub.fps == 23.976
+        assert len(sub) == len(frames)
+        assert sub[0].start == 1004 / 23.976
+        # Declaration is looked for on the first line of each input
+        again = parser.parse(b"{1}{1}25\r\n" + data)
+        assert (again.fps, again.declared_fps) == (25, 25)
+        assert again[0].start == 1004 / 25
+
+        # Explicit frame rate wins over the declared one
+        forced = Parser.from_format("MicroDVD", stop_level=None)
+        forced = forced.parse(b"{1}{1}23.976\r\n" + data, fps=25)
+        assert (forced.fps, forced.declared_fps) == (25, 23.976)
+        assert forced[0].start == 1004 / 25
+        buf = io.BytesIO()
+        Exporter.from_format("MicroDVD").export(buf, forced)
+        assert buf.getvalue().split(b"\r\n")[:2] == [
+            b"{1}{1}25",
+            data.split(b"\r\n")[0],
+        ]
+
+        frames.frames_to_seconds(23.976)
+        assert [(i.start, i.end) for i in frames] == [(i.start, i.end) for i in sub]
+        assert frames[0].duration == sub[0].duration
+
+        # Declared frame rate is used by default
+        frames = Parser.from_format("MicroDVD").parse(b"{25}{50}Hi\n", encoding="ascii")
+        frames.fps = 25
+        frames.frames_to_seconds()
+        assert (frames[0].start, frames[0].end) == (1.0, 2.0)
+
+    def test_header_cache(self):
+        """Tests that resolved MicroDVD headers are cached and keep their warnings."""
+        data = b"".join(
+            b"{%d}{%d}{y:i,x}{C:$0000FF}Hello!|{c:$00FF00}World!\n" % (i, i + 1)
+            for i in range(0, 100, 2)
+        )
+        expected = Parser.from_format("MicroDVD", stop_level=None)
+        expected.HEADER_CACHE = 0
+        sub = expected.parse(data, encoding="ascii")
+
+        parser = Parser.from_format("MicroDVD", stop_level=None)
+        assert parser.parse(data, encoding="ascii") == sub
+        assert parser.warnings == expected.warnings
+        assert len(parser.warnings) == 3 * len(sub)
+        assert len(parser._headers) == 3
+
+        # Every unit and line gets its own styles
+        parsed = parser.parse(data, encoding="ascii")
+        assert parsed[0][1].styles is not parsed[1][1].styles
+        assert parsed[0].styles is not parsed[1].styles
+        parsed[0][1].styles["*"]["color"] = "#000000"
+        parsed[0].styles["*"]["color"] = "#000000"
+        assert parsed[1] == sub[1]
+        assert parser.parse(data, encoding="ascii") == sub
+        assert b"&id" not in sub.dump()
+
+        # Headers are resolved again for new data
+        parser.parse(b"{1}{2}{c:$00FF00}Hi\n", encoding="ascii")
+        assert list(parser._headers) == ["{c:$00FF00}", (("c", "$00FF00"),)]
+
+    def test_line_history(self):
+        """Tests that parser keeps only a bounded history of read lines."""
+        with open("./tests/data/srt/8.srt", "rb") as f:
+            parser = Parser.from_format("SubRip", stop_level=None)
+            parser.parse(f)
+
+        assert len(parser._read_lines) == Parser.LINE_HISTORY
+        last = parser._current_line_num
+        assert parser._fetch_line(last) == parser._current_line
+        parser._fetch_line(last - Parser.LINE_HISTORY + 1)
+        self.assertRaises(ValueError, parser._fetch_line, last - Parser.LINE_HISTORY)
+
+        # Lines of new data are counted from the start
+        parser = Parser.from_format("MicroDVD", stop_level=None)
+        for i in range(2):
+            parser.parse(b"{1}{2}\n{3}{4}Hi\n{5}{6}\n", encoding="ascii")
+        assert [i["line_number"] for i in parser.warnings] == [1, 3, 1, 3]
+        assert parser._current_line_num == 2
+
+    def test_mapped_file(self):
+        """Tests parsing of memory mapped files given by filename."""
+        for path in (
+            "./tests/data/srt/8.srt",
+            "./tests/data/microdvd/2.sub",
+            "./tests/data/corner/lookup_error.srt",
+        ):
+            with open(path, "rb") as f:
+                data = f.read()
+            expected = Parser.from_data(data, stop_level=None)
+            sub = expected.parse()
+
+            parser = Parser.from_data(path, stop_level=None)
+            assert parser.parse() == sub
+            assert parser.warnings == expected.warnings
+            assert parser.encoding == expected.encoding
+
+            parser = Parser.from_format(parser.FORMAT, stop_level=None)
+            assert parser.parse(path, sample_size=4096) == sub
+
+        # Empty files cannot be mapped
+        path = os.path.join(tempfile.mkdtemp(), "empty.srt")
+        open(path, "wb").close()
+        self.assertRaises(NoParserError, Parser.from_data, path)
+        shutil.rmtree(os.path.dirname(path))
+
+    def test_parse_stats(self):
+        """Tests statistics collected while parsing."""
+        phases = []
+        stats = ParseStats(lambda phase, stats: phases.append(phase))
+        with open("./tests/data/srt/8.srt", "rb") as f:
+            data = f.read()
+        parser = Parser.from_data(data, stop_level=None, stats=stats)
+        sub = parser.parse()
+
+        assert phases == ["sniff", "detect", "metadata", "parse", "units", "build"]
+        assert stats.sizes == {"sniff": Parser.SNIFF_SIZE, "detect": len(data)}
+        assert stats.counts["units"] == stats.counts["build"] == len(sub)
+        assert stats.counts["lines"] == len(data.splitlines())
+        assert sum(stats.warnings.values()) == len(parser.warnings)
+        assert all(stats.times[i] > 0 for i in phases)
+
+    def test_sniff(self):
+        """Tests format recognition without encoding detection."""
+        for path, format in (
+            ("./tests/data/srt/1.srt", "SubRip"),
+            ("./tests/data/microdvd/2.sub", "MicroDVD"),
+            ("./tests/data/corner/autodetect.srt", "SubRip"),
+        ):
+            with open(path, "rb") as f:
+                assert Parser.sniff(f).FORMAT == format
+                assert f.tell() == 0
+                assert Parser.from_data(f).FORMAT == format
+
+        # Garbage after the signature does not matter
+        data = b"{1}{2}\x81\x8d\x8f\x90\x9d|\xff\xfe\n"
+        assert Parser.sniff(data).FORMAT == "MicroDVD"
+        self.assertRaises(NoParserError, Parser.sniff, b"Just some text")
+        self.assertRaises(NoParserError, Parser.from_format, "Unknown")
+
+        # Subclasses keeping the format of their parent do not replace it
+        class CustomParser(SubRipParser):
+            pass
+
+        assert type(Parser.from_format("SubRip")) is SubRipParser
+
+    def test_parse_many(self):
+        """Tests parsing of many subtitles in a process pool."""
+        inputs = [
+            "./tests/data/srt/12.srt",
+            b"Not a subtitle",
+            "./tests/data/microdvd/2.sub",
+            "./tests/data/srt/8.srt",
+        ]
+        results = list(Parser.parse_many(inputs, workers=2, stop_level=None))
+
+        assert [i.position for i in results] == [0, 1, 2, 3]
+        assert [i.format for i in results] == ["SubRip", None, "MicroDVD", "SubRip"]
+        assert isinstance(results[1].exception, NoParserError)
+        assert results[1].subtitle is None
+        for path, result in zip(inputs, results):
+            if result.exception:
+                continue
+            with open(path, "rb") as f:
+                parser = Parser.from_data(f, stop_level=None)
+                assert result.subtitle == parser.parse()
+                assert result.warnings == parser.warnings
+                assert result.encoding == parser.encoding
+
+        # Parse errors do not stop the batch
+        results = Parser.parse_many(inputs, format="SubRip", ordered=False)
+        assert sorted(i.position for i in results) == [0, 1, 2, 3]
+
+    def test_async(self):
+        """Tests parsing from and exporting to async streams."""
+
+        async def chunks(data, size):
+            for i in range(0, len(data), size):
+                await asyncio.sleep(0)
+                yield data[i : i + size]
+
+        class Writer(object):
+            def __init__(self):
+                self.data = b""
+
+            async def write(self, data):
+                self.data += data
+
+        paths = [
+            os.path.join("./tests/data/srt", i)
+            for i in sorted(os.listdir("./tests/data/srt"))
+            if i.endswith(".srt")
+        ] + ["./tests/data/microdvd/2.sub"]
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            expected = Parser.from_data(data, stop_level=None)
+            sub = expected.parse()
+
+            # Odd chunk size splits line endings and multibyte characters
+            parser = Parser.from_format(expected.FORMAT, stop_level=None)
+            result = asyncio.run(
+                parser.aparse(chunks(data, 7), encoding=expected.encoding)
+            )
+            assert result == sub, path
+            assert parser.warnings == expected.warnings, path
+            assert parser.errors == expected.errors, path
+
+        # Encoding of ASCII start is detected again once the rest arrives
+        head = b"".join(
+            b"%d\r\n00:00:%02d,000 --> 00:00:%02d,500\r\nText\r\n\r\n"
+            % (i, i % 60, i % 60)
+            for i in range(1, 2001)
+        )
+        with open("./tests/data/srt/8.srt", "rb") as f:
+            data = head + b"\r\n" + f.read()
+        expected = Parser.from_format("SubRip", stop_level=None)
+        sub = expected.parse(data, encoding="windows-1250")
+        parser = Parser.from_format("SubRip", stop_level=None)
+        result = asyncio.run(
+            parser.aparse(chunks(data, 4096), detect_size=len(head) // 2)
+        )
+        assert parser.encoding == "windows-1250"
+        assert result == sub
+        assert parser.warnings == expected.warnings
+
+        async def reencode():
+            reader = asyncio.StreamReader()
+            with open("./tests/data/srt/1.srt", "rb") as f:
+                reader.feed_data(f.read())
+            reader.feed_eof()
+
+            writer = Writer()
+            units = Parser.from_format("SubRip").aiter_units(reader)
+            await Exporter.from_format("SubRip").aexport(writer, units)
+            return writer.data
+
+        with open("./tests/data/srt/1.srt", "rb") as f:
+            sub = Parser.from_data(f).parse()
+        output = io.BytesIO()
+        Exporter.from_format("SubRip").export(output, sub)
+        assert asyncio.run(reencode()) == output.getvalue()